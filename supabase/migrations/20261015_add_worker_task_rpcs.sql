@@ -0,0 +1,88 @@
+-- =============================================================
+-- Worker RPCs  –  one round trip per task state change
+-- =============================================================
+-- Each state change used to take two requests from the worker (one on
+-- images, one on tasks).  These functions make both writes in a single
+-- call.  Only service_role (the workers) may execute them.
+
+-- 1. pending/failed -> processing, and open a tasks row.  Returns the task
+--    id, or NULL without changing anything if the image is already
+--    processing or completed (a duplicate delivery) or its row no longer
+--    exists (deleted after the task was queued).  The row lock makes
+--    the check and the claim atomic, so concurrent deliveries of the same
+--    image cannot both start.
+CREATE OR REPLACE FUNCTION public.start_image_task(
+    p_image_id  uuid,
+    p_worker_id text
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_status  text;
+    v_task_id uuid;
+BEGIN
+    SELECT status INTO v_status FROM public.images WHERE id = p_image_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    IF v_status IN ('processing', 'completed') THEN
+        RETURN NULL;
+    END IF;
+    UPDATE public.images SET status = 'processing' WHERE id = p_image_id;
+    INSERT INTO public.tasks (image_id, worker_id, started_at)
+    VALUES (p_image_id, p_worker_id, now())
+    RETURNING id INTO v_task_id;
+    RETURN v_task_id;
+END;
+$$;
+
+-- 2. processing -> completed, and close the task.
+--    A NULL manifest leaves any existing c2pa_manifest untouched.
+CREATE OR REPLACE FUNCTION public.complete_image_task(
+    p_image_id      uuid,
+    p_task_id       uuid,
+    p_protected_url text,
+    p_watermark_id  text,
+    p_c2pa_manifest jsonb DEFAULT NULL
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.images
+       SET status        = 'completed',
+           protected_url = p_protected_url,
+           watermark_id  = p_watermark_id,
+           c2pa_manifest = COALESCE(p_c2pa_manifest, c2pa_manifest)
+     WHERE id = p_image_id;
+    IF p_task_id IS NOT NULL THEN
+        UPDATE public.tasks SET completed_at = now() WHERE id = p_task_id;
+    END IF;
+END;
+$$;
+
+-- 3. processing -> failed, and record the error on the task.
+CREATE OR REPLACE FUNCTION public.fail_image_task(
+    p_image_id  uuid,
+    p_task_id   uuid,
+    p_error_log text
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.images SET status = 'failed' WHERE id = p_image_id;
+    IF p_task_id IS NOT NULL THEN
+        UPDATE public.tasks SET error_log = left(p_error_log, 4000) WHERE id = p_task_id;
+    END IF;
+END;
+$$;
+
+-- 4. Workers only
+REVOKE EXECUTE ON FUNCTION public.start_image_task(uuid, text) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.complete_image_task(uuid, uuid, text, text, jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.fail_image_task(uuid, uuid, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.start_image_task(uuid, text) TO service_role;
+GRANT EXECUTE ON FUNCTION public.complete_image_task(uuid, uuid, text, text, jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION public.fail_image_task(uuid, uuid, text) TO service_role;
@@ -9,9 +9,12 @@ Reference: https://opensource.contentauthenticity.org/docs/c2pa-python
 """
 from __future__ import annotations
 
+import io
 import json
 import logging
+import mimetypes
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -32,50 +35,83 @@ def _get_signing_credentials() -> tuple[bytes, bytes]:
     return _DEV_CERT, _DEV_KEY
 
 
-def sign_c2pa(input_path: str, output_path: str) -> dict[str, object] | None:
-    """Sign an image with a C2PA manifest.
-
-    Args:
-        input_path: Path to the image to sign.
-        output_path: Path where the signed image will be written.
-
-    Returns:
-        The manifest dict that was embedded, or None if signing was skipped/failed.
-    """
-    manifest_data: dict[str, object] = {
-        "claim_generator": "lore-anchor/1.0",
-        "title": "Protected by Lore Anchor",
-        "assertions": [
-            {
-                "label": "c2pa.training-mining",
-                "data": {
-                    "entries": {
-                        "c2pa.ai_generative_training": {"use": "notAllowed"},
-                        "c2pa.ai_inference": {"use": "notAllowed"},
-                        "c2pa.ai_training": {"use": "notAllowed"},
-                        "c2pa.data_mining": {"use": "notAllowed"},
-                    },
+# The manifest is identical for every image, so it is built and serialised
+# once at import instead of on every sign_c2pa call.
+_MANIFEST: dict[str, object] = {
+    "claim_generator": "lore-anchor/1.0",
+    "title": "Protected by Lore Anchor",
+    "assertions": [
+        {
+            "label": "c2pa.training-mining",
+            "data": {
+                "entries": {
+                    "c2pa.ai_generative_training": {"use": "notAllowed"},
+                    "c2pa.ai_inference": {"use": "notAllowed"},
+                    "c2pa.ai_training": {"use": "notAllowed"},
+                    "c2pa.data_mining": {"use": "notAllowed"},
                 },
             },
-        ],
-    }
+        },
+    ],
+}
+# Builder takes the manifest as a JSON str (it does its own UTF-8 conversion),
+# so keep it a str, just without the default whitespace.
+_MANIFEST_JSON = json.dumps(_MANIFEST, separators=(",", ":"))
 
-    try:
-        from c2pa import Builder, SigningAlg, create_signer
+# Inputs larger than this are signed via the streaming Builder.sign API.
+_STREAM_SIGN_THRESHOLD = 64 * 1024 * 1024
 
-        builder = Builder(json.dumps(manifest_data))
+
+_signers = threading.local()
+
+
+def _get_signer():  # type: ignore[no-untyped-def]
+    """Build the ES256 signer once per thread.
+
+    Parsing the key and certificate chain is the same work for every image;
+    credentials come from the environment and do not change at runtime.
+    Signers wrap native state that is not documented as thread-safe, and
+    the worker signs on several I/O threads at once, so each thread gets
+    its own instead of sharing one.
+    """
+    signer = getattr(_signers, "signer", None)
+    if signer is None:
+        from c2pa import SigningAlg, create_signer
 
         cert_pem, key_pem = _get_signing_credentials()
-        signer = create_signer(
+        signer = _signers.signer = create_signer(
             sign_cert=cert_pem,
             private_key=key_pem,
             signing_alg=SigningAlg.ES256,
             ta_url=None,
         )
+    return signer
+
+
+def sign_c2pa(input_path: str, output_path: str) -> dict[str, object] | None:
+    """Sign an image with a C2PA manifest.
+
+    Args:
+        input_path: Path to the image to sign.
+        output_path: Path where the signed image will be written.
 
-        builder.sign_file(signer, input_path, output_path)
-        logger.info("C2PA manifest signed: %s -> %s", input_path, output_path)
-        return manifest_data
+    Returns:
+        The manifest dict that was embedded, or None if signing was skipped/failed.
+    """
+    try:
+        from c2pa import Builder
+
+        builder = Builder(_MANIFEST_JSON)
+        if os.path.getsize(input_path) > _STREAM_SIGN_THRESHOLD:
+            # Large files: sign through buffered file streams so the source is
+            # read once instead of being loaded into memory up front.
+            mime = mimetypes.guess_type(input_path)[0] or "image/png"
+            with open(input_path, "rb") as source, open(output_path, "wb") as dest:
+                builder.sign(_get_signer(), mime, source, dest)
+        else:
+            builder.sign_file(_get_signer(), input_path, output_path)
+        logger.debug("C2PA manifest signed: %s -> %s", input_path, output_path)
+        return dict(_MANIFEST)
 
     except ImportError:
         logger.warning(
@@ -92,6 +128,41 @@ def sign_c2pa(input_path: str, output_path: str) -> dict[str, object] | None:
         return None
 
 
+def sign_c2pa_bytes(
+    data: bytes, mime: str = "image/png",
+) -> tuple[bytes, dict[str, object] | None]:
+    """Sign an in-memory image with the C2PA manifest.
+
+    Same as :func:`sign_c2pa`, but reads and writes memory buffers.
+
+    Args:
+        data: The encoded image to sign.
+        mime: MIME type of *data*.
+
+    Returns:
+        ``(signed, manifest)``; on failure *data* is returned unsigned with
+        ``None`` as the manifest.
+    """
+    try:
+        from c2pa import Builder
+
+        builder = Builder(_MANIFEST_JSON)
+        dest = io.BytesIO()
+        builder.sign(_get_signer(), mime, io.BytesIO(data), dest)
+        logger.debug("C2PA manifest signed: %d bytes in memory", len(data))
+        return dest.getvalue(), dict(_MANIFEST)
+
+    except ImportError:
+        logger.warning(
+            "c2pa-python not installed. Returning image without C2PA signature."
+        )
+        return data, None
+
+    except Exception:
+        logger.exception("C2PA signing failed, returning unsigned image.")
+        return data, None
+
+
 # ---------------------------------------------------------------------------
 # Development self-signed certificate (ES256)
 # Replace with real certs in production via environment variables.
@@ -7,4 +7,14 @@ def apply_mist_v2(*args, **kwargs):  # type: ignore[no-untyped-def]
     return _fn(*args, **kwargs)
 
 
-__all__ = ["apply_mist_v2", "MistMode"]
+def apply_mist_v2_batch(*args, **kwargs):  # type: ignore[no-untyped-def]
+    from core.mist.mist_v2 import apply_mist_v2_batch as _fn
+    return _fn(*args, **kwargs)
+
+
+def apply_mist_v2_tensors(*args, **kwargs):  # type: ignore[no-untyped-def]
+    from core.mist.mist_v2 import apply_mist_v2_tensors as _fn
+    return _fn(*args, **kwargs)
+
+
+__all__ = ["apply_mist_v2", "apply_mist_v2_batch", "apply_mist_v2_tensors", "MistMode"]
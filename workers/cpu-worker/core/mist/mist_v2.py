@@ -29,6 +29,7 @@ References
 """
 from __future__ import annotations
 
+import contextlib
 import logging
 import math
 from enum import Enum
@@ -53,45 +54,79 @@ class MistMode(str, Enum):
 # ---------------------------------------------------------------------------
 
 
-def _to_tensor(image: Image.Image):  # type: ignore[no-untyped-def]
-    from torchvision import transforms
-    return transforms.ToTensor()(image)
+def _upload_uint8(image: Image.Image, device):  # type: ignore[no-untyped-def]
+    """RGB image -> uint8 ``[3, H, W]`` tensor on *device*.
+
+    Stages the raw pixels through pinned memory so the H2D copy is
+    asynchronous and moves 1 byte per channel; work queued after it (e.g.
+    building the texture target) does not wait on the copy.
+    """
+    import torch
+
+    pixels = np.asarray(image)
+    on_cuda = torch.device(device).type == "cuda"
+    host = torch.empty(pixels.shape, dtype=torch.uint8, pin_memory=on_cuda)
+    host.numpy()[...] = pixels
+    return host.to(device, non_blocking=on_cuda).permute(2, 0, 1)
 
 
 def _normalize(t):  # type: ignore[no-untyped-def]
-    """[0,1] -> [-1,1] (SD VAE input range)."""
+    """[0,1] -> [-1,1] (SD VAE input range).
+
+    Mean and std are both 0.5 for every channel, so ``(t - 0.5) / 0.5`` is
+    one scalar affine op — no per-call constant tensors on the device.
+    """
+    return t * 2.0 - 1.0
+
+
+def _tensor_to_uint8(t):  # type: ignore[no-untyped-def]
+    """[3,H,W] float in [0,1] -> [3,H,W] uint8, on the tensor's own device."""
     import torch
-    mean = torch.tensor([0.5, 0.5, 0.5], device=t.device).view(3, 1, 1)
-    std = torch.tensor([0.5, 0.5, 0.5], device=t.device).view(3, 1, 1)
-    return (t - mean) / std
+    return t.clamp(0, 1).mul(255).to(torch.uint8)
 
 
 def _tensor_to_pil(t) -> Image.Image:  # type: ignore[no-untyped-def]
-    arr = (t.clamp(0, 1).cpu().numpy() * 255).astype(np.uint8)
-    return Image.fromarray(arr.transpose(1, 2, 0))
+    """[3,H,W] uint8 tensor -> PIL image.
+
+    Permutes on the tensor's device, so the D2H copy is a single contiguous
+    uint8 HWC buffer that PIL wraps without another copy.
+    """
+    return Image.fromarray(t.permute(1, 2, 0).contiguous().cpu().numpy())
 
 
 # ---------------------------------------------------------------------------
 # Texture target generation  (Mist v2 core idea)
 # ---------------------------------------------------------------------------
+_texture_cache: dict[tuple[int, int, str], object] = {}
+_TEXTURE_CACHE_MAX = 32
+
+
 def _make_texture_target(h: int, w: int, device):  # type: ignore[no-untyped-def]
     """Generate a grey checkerboard target in [-1,1] for the VAE latent.
 
     Mist v2 steers the adversarial latent *toward* a semantically unrelated
     texture.  This forces the VAE decoder to reconstruct garbage when the
     fine-tuned model tries to reproduce the original.
+
+    The target depends only on the latent size and device, so it is cached
+    per ``(h, w, device)``; callers must treat it as read-only.
     """
+    key = (h, w, _vae_key(device))
+    cached = _texture_cache.get(key)
+    if cached is not None:
+        return cached
+
     import torch
 
     block = 8
-    rows = (h + block - 1) // block
-    cols = (w + block - 1) // block
-    checker = np.indices((rows, cols)).sum(axis=0) % 2  # 0/1
-    checker = checker.astype(np.float32)
-    checker = np.kron(checker, np.ones((block, block)))[:h, :w]
-    checker = checker * 2.0 - 1.0
-    target = torch.tensor(checker, dtype=torch.float32, device=device)
+    rows = torch.arange(h, device=device) // block
+    cols = torch.arange(w, device=device) // block
+    checker = (rows[:, None] + cols[None, :]) % 2  # 0/1, built on *device*
+    target = checker.to(torch.float32) * 2.0 - 1.0
     target = target.unsqueeze(0).unsqueeze(0).expand(1, 4, -1, -1)
+    if len(_texture_cache) >= _TEXTURE_CACHE_MAX:
+        _texture_cache.clear()
+    _texture_cache[key] = target
     return target
 
 
@@ -117,10 +152,20 @@ def _make_texture_image(size: tuple[int, int]) -> Image.Image:
 _vae_cache: dict[str, object] = {}
 
 
+def _vae_key(device) -> str:  # type: ignore[no-untyped-def]
+    """Canonical cache key so ``"cuda"`` and ``"cuda:0"`` share one VAE."""
+    import torch
+
+    device = torch.device(device)
+    if device.type == "cuda" and device.index is None:
+        device = torch.device("cuda", torch.cuda.current_device())
+    return str(device)
+
+
 def _get_vae(device):  # type: ignore[no-untyped-def]
     import torch
 
-    key = str(device)
+    key = _vae_key(device)
     if key in _vae_cache:
         return _vae_cache[key]  # type: ignore[return-value]
 
@@ -140,52 +185,132 @@ def _get_vae(device):  # type: ignore[no-untyped-def]
             torch_dtype=torch.float32,
         )
     vae = vae.to(device).eval()
-    for p in vae.parameters():
-        p.requires_grad_(False)
+    # Only the input image needs gradients during PGD — never the weights.
+    vae.requires_grad_(False)
+    if torch.device(device).type == "cuda":
+        # NHWC lets cuDNN pick its fused tensor-core conv kernels.
+        vae = vae.to(memory_format=torch.channels_last)
+        if torch.cuda.is_bf16_supported():
+            # PGD runs the VAE under bf16 autocast (see _autocast), which would
+            # otherwise re-cast the frozen fp32 weights on every step; storing
+            # them in bf16 skips that and halves their memory traffic.
+            vae = vae.to(torch.bfloat16)
     _vae_cache[key] = vae
-    logger.info("VAE loaded on %s", device)
+    logger.info("VAE loaded on %s", key)
     return vae
 
 
+def _compile_vae(device, mode: str = "max-autotune"):  # type: ignore[no-untyped-def]
+    """Wrap the cached VAE's encoder in ``torch.compile`` (CUDA only).
+
+    Both ``max-autotune`` and ``reduce-overhead`` replay each PGD step from a
+    CUDA graph instead of relaunching the encoder's kernels, since PGD feeds
+    the same input shape every step; ``max-autotune`` also benchmarks kernel
+    choices, which makes compilation take minutes rather than seconds.
+    Either way compilation happens on the first call for each input size, so
+    call this once at worker startup and warm up before taking traffic.
+    """
+    import torch
+
+    vae = _get_vae(device)
+    if torch.device(device).type != "cuda" or getattr(vae, "_lore_compiled", False):
+        return vae
+    vae.encoder = torch.compile(vae.encoder, mode=mode)
+    vae._lore_compiled = True
+    logger.info("VAE encoder compiled (torch.compile, %s) on %s", mode, _vae_key(device))
+    return vae
+
+
+def _autocast(device):  # type: ignore[no-untyped-def]
+    """bf16 autocast on CUDA parts that support it, otherwise a no-op (fp32)."""
+    import torch
+
+    if device.type == "cuda" and torch.cuda.is_bf16_supported():
+        return torch.autocast(device_type="cuda", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
 # ---------------------------------------------------------------------------
 # Attack: VAE-based PGD with texture target
 # ---------------------------------------------------------------------------
 def _pgd_vae(
-    image: Image.Image,
+    images: list[Image.Image],
     *,
     epsilon: int,
     steps: int,
     device,  # torch.device
-) -> Image.Image:
+) -> list[Image.Image]:
+    """PIL front end of :func:`_pgd_vae_tensors`."""
+    xs = [_upload_uint8(image, device) for image in images]
+    return [_tensor_to_pil(t) for t in _pgd_vae_tensors(xs, epsilon=epsilon, steps=steps)]
+
+
+def _pgd_vae_tensors(  # type: ignore[no-untyped-def]
+    xs, *, epsilon: int, steps: int, bucket: int = 8, alpha_scale: float = 2.0,
+):
+    """Run PGD jointly over uint8 ``[3, H, W]`` tensors as one ``[N, 3, H, W]`` batch.
+
+    Each image is reflect-padded up to a multiple of 8 and edge-padded to
+    the largest size in the batch, rounded up to a multiple of *bucket*, so
+    every PGD step is a single VAE forward/backward; the padding is cropped
+    off again at the end.  The VAE treats samples independently and the
+    update uses only the sign of the gradient, so with the default bucket
+    same-sized images get the perturbation they would get on their own.
+    Each step moves by ``alpha_scale * epsilon / steps``, so a larger
+    *alpha_scale* reaches the edge of the ε-ball in fewer steps.
+    Returns uint8 ``[3, H, W]`` tensors on the inputs' device.
+    """
     import torch
     import torch.nn.functional as F
 
+    device = xs[0].device
     vae = _get_vae(device)
 
-    # align to multiples of 8
-    w, h = image.size
-    nw, nh = (w // 8) * 8, (h // 8) * 8
-    if (nw, nh) != (w, h):
-        image = image.resize((nw, nh), Image.LANCZOS)
-
-    x_orig = _to_tensor(image).unsqueeze(0).to(device)
+    sizes = [tuple(x.shape[1:]) for x in xs]
+    bh = max(-(-h // bucket) * bucket for h, _ in sizes)
+    bw = max(-(-w // bucket) * bucket for _, w in sizes)
+    padded = []
+    for x, (h, w) in zip(xs, sizes):
+        t = x.unsqueeze(0).float().div_(255.0)
+        # align to multiples of 8 (reflect needs the pad to be < the side)
+        pad_h, pad_w = -h % 8, -w % 8
+        if pad_h or pad_w:
+            mode = "reflect" if h > pad_h and w > pad_w else "replicate"
+            t = F.pad(t, (0, pad_w, 0, pad_h), mode=mode)
+        # then up to the batch size
+        if t.shape[2:] != (bh, bw):
+            t = F.pad(t, (0, bw - t.shape[3], 0, bh - t.shape[2]), mode="replicate")
+        padded.append(t)
+    x_orig = torch.cat(padded)
+    # the latent is 1/8 of the (8-aligned) input on each side
+    z_target = _make_texture_target(bh // 8, bw // 8, device)
+    if x_orig.is_cuda:
+        x_orig = x_orig.contiguous(memory_format=torch.channels_last)
     eps = epsilon / 255.0
-    alpha = eps / max(steps, 1) * 2.0  # step size ~2x eps/steps (PGD convention)
+    alpha = eps / max(steps, 1) * alpha_scale  # ~2x eps/steps is the PGD convention
 
     # --- Encode clean image & build texture target ---
-    with torch.no_grad():
+    # The VAE forward/backward runs under bf16 autocast; x_adv, the losses and
+    # the ε-ball projection stay in fp32 so the perturbation budget is exact.
+    with torch.inference_mode(), _autocast(x_orig.device):
         z_orig = vae.encode(_normalize(x_orig)).latent_dist.mean
-    z_target = _make_texture_target(z_orig.shape[2], z_orig.shape[3], device)
+    # Inference tensors cannot be saved for backward; the loss below needs a
+    # normal fp32 tensor, so take one (cheap — latent is 1/64 of the image).
+    z_orig = z_orig.to(torch.float32, copy=True)
+    z_target = z_target.expand_as(z_orig)
 
-    # Random start inside ε-ball (improves PGD convergence)
-    delta = torch.empty_like(x_orig).uniform_(-eps, eps)
-    x_adv = (x_orig + delta).clamp(0.0, 1.0).detach().requires_grad_(True)
+    # Random start inside ε-ball (improves PGD convergence).  x_adv is a single
+    # leaf updated in place; its .grad buffer is zeroed and reused every step.
+    x_adv = torch.empty_like(x_orig).uniform_(-eps, eps)
+    x_adv.add_(x_orig).clamp_(0.0, 1.0).requires_grad_(True)
 
     for i in range(steps):
         if x_adv.grad is not None:
             x_adv.grad.zero_()
 
-        z_adv = vae.encode(_normalize(x_adv)).latent_dist.mean
+        with _autocast(x_adv.device):
+            z_adv = vae.encode(_normalize(x_adv)).latent_dist.mean
+        z_adv = z_adv.float()
 
         # Combined loss:
         #   maximize  ‖z_adv - z_orig‖²   (push away from original)
@@ -196,28 +321,46 @@ def _pgd_vae(
         loss.backward()
 
         with torch.no_grad():
-            grad_sign = x_adv.grad.sign()
-            x_adv = x_adv - alpha * grad_sign  # descend (loss is negated for "away")
+            # descend (loss is negated for "away"), then project onto the
+            # ε-ball:  x ← clamp(x0 + clamp(x - α·sign(g) - x0, ±ε), 0, 1).
+            # Computed in place in the grad buffer (zeroed next step), so the
+            # update allocates no temporaries.
+            step = x_adv.grad.sign_().mul_(-alpha).add_(x_adv).sub_(x_orig)
+            x_adv.copy_(step.clamp_(-eps, eps).add_(x_orig).clamp_(0.0, 1.0))
 
-            # project onto ε-ball
-            perturbation = (x_adv - x_orig).clamp(-eps, eps)
-            x_adv = (x_orig + perturbation).clamp(0.0, 1.0)
-
-        x_adv = x_adv.detach().requires_grad_(True)
-        logger.debug(
-            "PGD step %d/%d  loss_away=%.5f  loss_toward=%.5f",
-            i + 1, steps, loss_away.item(), loss_toward.item(),
-        )
+        # .item() forces a device sync — only pay for it when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "PGD step %d/%d  loss_away=%.5f  loss_toward=%.5f",
+                i + 1, steps, loss_away.item(), loss_toward.item(),
+            )
 
-    result = _tensor_to_pil(x_adv.squeeze(0).detach())
-    if (nw, nh) != (w, h):
-        result = result.resize((w, h), Image.LANCZOS)
-    return result
+    x_adv = x_adv.detach()
+    return [_tensor_to_uint8(x_adv[n, :, :h, :w]) for n, (h, w) in enumerate(sizes)]
 
 
 # ---------------------------------------------------------------------------
 # Attack: Frequency-domain perturbation (no model required)
 # ---------------------------------------------------------------------------
+_DCT_BLOCK = 8
+
+
+def _make_idct_basis(n: int) -> np.ndarray:
+    """Scaled IDCT basis ``B[u, x] = c(u)·cos((2x+1)uπ / 2n)·sqrt(2/n)``."""
+    u = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    basis = np.cos((2 * x + 1) * u * math.pi / (2 * n))
+    basis[0, :] /= math.sqrt(2)
+    return basis * math.sqrt(2.0 / n)
+
+
+_IDCT_BASIS = _make_idct_basis(_DCT_BLOCK)
+
+# Mid-high band of an 8×8 DCT block: coefficients with 3 <= u + v <= 10.
+_MIDBAND_FREQ = np.add.outer(np.arange(_DCT_BLOCK), np.arange(_DCT_BLOCK))
+_MIDBAND_MASK = ((_MIDBAND_FREQ >= 3) & (_MIDBAND_FREQ <= 10)).astype(np.float32)
+
+
 def _freq_perturbation(
     image: Image.Image,
     *,
@@ -238,20 +381,16 @@ def _freq_perturbation(
 
     # --- build perturbation per 8x8 block (DCT-style) ---
     perturbation = np.zeros_like(x)
-    block = 8
-    for ch in range(c):
-        for by in range(0, h - block + 1, block):
-            for bx in range(0, w - block + 1, block):
-                blk = np.zeros((block, block), dtype=np.float32)
-                # inject energy into mid-high frequency DCT coefficients
-                for u in range(block):
-                    for v in range(block):
-                        freq = u + v
-                        if 3 <= freq <= 10:  # mid-high band
-                            blk[u, v] = rng.choice([-1.0, 1.0])
-                # inverse DCT approximation via cosine basis
-                patch = _idct2_block(blk, block)
-                perturbation[by:by + block, bx:bx + block, ch] += patch
+    block = _DCT_BLOCK
+    nby, nbx = h // block, w // block
+    # ±1 in the mid-high frequency DCT coefficients of every block, one draw
+    signs = rng.integers(0, 2, size=(c, nby, nbx, block, block), dtype=np.int8)
+    coeffs = (signs.astype(np.float32) * 2.0 - 1.0) * _MIDBAND_MASK
+    # inverse DCT of every block at once, then tile blocks back to [H, W, C]
+    patches = _idct2_blocks(coeffs)
+    perturbation[:nby * block, :nbx * block, :] = (
+        patches.transpose(1, 3, 2, 4, 0).reshape(nby * block, nbx * block, c)
+    )
 
     # Normalize to epsilon budget
     max_abs = np.abs(perturbation).max()
@@ -266,23 +405,13 @@ def _freq_perturbation(
     return Image.fromarray(result)
 
 
-def _idct2_block(coeffs: np.ndarray, n: int) -> np.ndarray:
-    """Compute a simple inverse 2D DCT for an n×n block."""
-    result = np.zeros((n, n), dtype=np.float32)
-    for x in range(n):
-        for y in range(n):
-            s = 0.0
-            for u in range(n):
-                for v in range(n):
-                    cu = 1.0 / math.sqrt(2) if u == 0 else 1.0
-                    cv = 1.0 / math.sqrt(2) if v == 0 else 1.0
-                    s += (
-                        cu * cv * coeffs[u, v]
-                        * math.cos((2 * x + 1) * u * math.pi / (2 * n))
-                        * math.cos((2 * y + 1) * v * math.pi / (2 * n))
-                    )
-            result[x, y] = s * 2.0 / n
-    return result
+def _idct2_blocks(coeffs: np.ndarray) -> np.ndarray:
+    """Inverse 2D DCT of every n×n block in ``coeffs[..., n, n]``.
+
+    The separable IDCT is ``B^T @ C @ B`` with the precomputed cosine basis,
+    so all blocks go through one batched matmul instead of a scalar loop.
+    """
+    return (_IDCT_BASIS.T @ coeffs @ _IDCT_BASIS).astype(np.float32)
 
 
 # ---------------------------------------------------------------------------
@@ -315,7 +444,7 @@ def apply_mist_v2(
         if device is None:
             device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         try:
-            result = _pgd_vae(image, epsilon=epsilon, steps=steps, device=device)
+            result = _pgd_vae([image], epsilon=epsilon, steps=steps, device=device)[0]
             logger.info("Mist v2 (VAE PGD) applied — eps=%d, steps=%d", epsilon, steps)
             return result
         except Exception:
@@ -326,3 +455,133 @@ def apply_mist_v2(
     result = _freq_perturbation(image, epsilon=epsilon, steps=steps)
     logger.info("Mist v2 (freq) applied — eps=%d, steps=%d", epsilon, steps)
     return result
+
+
+def _retry_split(exc: Exception, batch_size: int) -> bool:
+    """Decide what to do after a batched VAE run raised *exc*.
+
+    A batch that ran out of GPU memory is retried one image at a time (the
+    caller does that after leaving its ``except`` block, so the failed
+    batch's tensors are freed first); anything else falls back to freq
+    mode as before.  Returns ``True`` to split.
+    """
+    import torch
+
+    if batch_size > 1 and isinstance(exc, torch.cuda.OutOfMemoryError):
+        logger.warning(
+            "VAE batch of %d ran out of GPU memory, retrying one image at a time", batch_size,
+        )
+        return True
+    logger.warning("VAE mode failed, falling back to freq mode.", exc_info=exc)
+    return False
+
+
+def apply_mist_v2_batch(
+    images: list[Image.Image],
+    *,
+    epsilon: int = 8,
+    steps: int = 100,
+    mode: str | MistMode = MistMode.VAE,
+    device: "torch.device | None" = None,
+) -> list[Image.Image]:
+    """Apply Mist v2 to several images with a single batched PGD run.
+
+    Same arguments as :func:`apply_mist_v2`, but takes a list of images and
+    returns the protected images in the same order.  In VAE mode all images
+    share each PGD forward/backward pass; freq mode has no model to batch
+    and simply maps over *images*.
+    """
+    mode = MistMode(mode)
+    if not images:
+        return []
+
+    if mode is MistMode.VAE:
+        import torch
+        if device is None:
+            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        split = False
+        try:
+            results = _pgd_vae(images, epsilon=epsilon, steps=steps, device=device)
+            logger.info(
+                "Mist v2 (VAE PGD) applied to batch of %d — eps=%d, steps=%d",
+                len(images), epsilon, steps,
+            )
+            return results
+        except Exception as exc:
+            split = _retry_split(exc, len(images))
+        if split:
+            return [
+                apply_mist_v2_batch([image], epsilon=epsilon, steps=steps, mode=mode, device=device)[0]
+                for image in images
+            ]
+
+    results = [_freq_perturbation(image, epsilon=epsilon, steps=steps) for image in images]
+    logger.info(
+        "Mist v2 (freq) applied to batch of %d — eps=%d, steps=%d",
+        len(images), epsilon, steps,
+    )
+    return results
+
+
+def apply_mist_v2_tensors(
+    images: list["torch.Tensor"],
+    *,
+    epsilon: int = 8,
+    steps: int = 100,
+    mode: str | MistMode = MistMode.VAE,
+    bucket: int = 8,
+    alpha_scale: float = 2.0,
+) -> list["torch.Tensor"]:
+    """Apply Mist v2 to uint8 ``[3, H, W]`` tensors that are already on a device.
+
+    Batched like :func:`apply_mist_v2_batch`, for pipelines that keep images
+    on the GPU between stages: VAE mode runs on the tensors' device with no
+    host round trip and returns uint8 ``[3, H, W]`` tensors there.  Freq
+    mode (and the VAE fallback) runs on the host and copies the results
+    back to the device.
+
+    In VAE mode the batch is padded up to a multiple of *bucket* pixels
+    (a multiple of 8).  A coarser bucket gives fewer distinct input shapes,
+    so cuDNN autotuning and compiled graphs are reused across image sizes,
+    at the cost of some extra padding.  *alpha_scale* sets the PGD step
+    size as a multiple of ``epsilon / steps``.
+    """
+    mode = MistMode(mode)
+    if bucket <= 0 or bucket % 8:
+        raise ValueError(f"bucket must be a positive multiple of 8, got {bucket}")
+    if not images:
+        return []
+
+    if mode is MistMode.VAE:
+        split = False
+        try:
+            results = _pgd_vae_tensors(
+                images, epsilon=epsilon, steps=steps, bucket=bucket, alpha_scale=alpha_scale,
+            )
+            logger.info(
+                "Mist v2 (VAE PGD) applied to batch of %d — eps=%d, steps=%d",
+                len(images), epsilon, steps,
+            )
+            return results
+        except Exception as exc:
+            split = _retry_split(exc, len(images))
+        if split:
+            return [
+                apply_mist_v2_tensors(
+                    [t], epsilon=epsilon, steps=steps, mode=mode, bucket=bucket,
+                    alpha_scale=alpha_scale,
+                )[0]
+                for t in images
+            ]
+
+    results = [
+        _upload_uint8(
+            _freq_perturbation(_tensor_to_pil(t), epsilon=epsilon, steps=steps), t.device,
+        )
+        for t in images
+    ]
+    logger.info(
+        "Mist v2 (freq) applied to batch of %d — eps=%d, steps=%d",
+        len(images), epsilon, steps,
+    )
+    return results
@@ -17,4 +17,32 @@ def verify_watermark(*args, **kwargs):  # type: ignore[no-untyped-def]
     return _fn(*args, **kwargs)
 
 
-__all__ = ["embed_watermark", "extract_watermark", "verify_watermark"]
+def embed_watermarks(*args, **kwargs):  # type: ignore[no-untyped-def]
+    from core.seal.pixelseal import embed_watermarks as _fn
+    return _fn(*args, **kwargs)
+
+
+def extract_watermarks(*args, **kwargs):  # type: ignore[no-untyped-def]
+    from core.seal.pixelseal import extract_watermarks as _fn
+    return _fn(*args, **kwargs)
+
+
+def embed_watermark_tensor(*args, **kwargs):  # type: ignore[no-untyped-def]
+    from core.seal.pixelseal import embed_watermark_tensor as _fn
+    return _fn(*args, **kwargs)
+
+
+def extract_watermark_tensor(*args, **kwargs):  # type: ignore[no-untyped-def]
+    from core.seal.pixelseal import extract_watermark_tensor as _fn
+    return _fn(*args, **kwargs)
+
+
+__all__ = [
+    "embed_watermark",
+    "extract_watermark",
+    "verify_watermark",
+    "embed_watermarks",
+    "extract_watermarks",
+    "embed_watermark_tensor",
+    "extract_watermark_tensor",
+]
@@ -22,13 +22,22 @@ References
 """
 from __future__ import annotations
 
+import contextlib
+import functools
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from typing import TYPE_CHECKING
 
 import numpy as np
 from PIL import Image
 
+try:  # optional: JIT-compiled Haar kernels, NumPy fallback below
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 if TYPE_CHECKING:
     import torch
 
@@ -46,20 +55,21 @@ class SealBackend(str, Enum):
 # Bit <-> ID helpers
 # ============================================================================
 def _id_to_bits(watermark_id: str) -> np.ndarray:
-    """32-char hex -> 128-element {-1, +1} array (bipolar for spread-spectrum)."""
-    value = int(watermark_id[:32], 16)
-    return np.array(
-        [1.0 if (value >> i) & 1 else -1.0 for i in range(WATERMARK_BITS)],
-        dtype=np.float32,
-    )
+    """32-char hex -> 128-element {-1, +1} array (bipolar for spread-spectrum).
+
+    Element *i* is bit *i* of the integer value (LSB first).
+    """
+    raw = int(watermark_id[:32], 16).to_bytes(WATERMARK_BITS // 8, "little")
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")
+    return bits.astype(np.float32) * 2.0 - 1.0
 
 
 def _bits_to_id(bits: np.ndarray) -> str:
     """128-element float array -> 32-char hex.  Decision boundary at 0."""
-    value = 0
-    for i in range(min(len(bits), WATERMARK_BITS)):
-        if bits[i] > 0:
-            value |= 1 << i
+    hard = np.zeros(WATERMARK_BITS, dtype=bool)
+    n = min(len(bits), WATERMARK_BITS)
+    hard[:n] = np.asarray(bits[:n]) > 0
+    value = int.from_bytes(np.packbits(hard, bitorder="little").tobytes(), "little")
     return f"{value:032x}"
 
 
@@ -67,43 +77,113 @@ def _bits_to_id(bits: np.ndarray) -> str:
 # Spread-spectrum chip sequence (PN code)
 # ============================================================================
 def _pn_sequence(seed: int, length: int) -> np.ndarray:
-    """Deterministic pseudo-random {-1, +1} chip sequence."""
+    """Deterministic pseudo-random {-1, +1} chip sequence.
+
+    ``integers(0, 2)`` consumes the generator exactly like the original
+    ``choice([-1.0, 1.0])``, so the chips are unchanged — just cheaper to draw.
+    """
     rng = np.random.default_rng(seed)
-    return rng.choice([-1.0, 1.0], size=length).astype(np.float32)
+    return (rng.integers(0, 2, size=length) * 2 - 1).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=8)
+def _pn_matrix(chips_per_bit: int) -> np.ndarray:
+    """[WATERMARK_BITS, chips_per_bit] chip matrix, row *b* seeded per bit.
+
+    Rows are the same per-bit sequences as before (``_CHIP_SEED_BASE + b``),
+    so existing watermarks still decode.  Cached per chip count (i.e. per
+    image size) and returned read-only since the cache shares it.
+    """
+    pn = np.empty((WATERMARK_BITS, chips_per_bit), dtype=np.float32)
+    for b in range(WATERMARK_BITS):
+        pn[b] = _pn_sequence(_CHIP_SEED_BASE + b, chips_per_bit)
+    pn.setflags(write=False)
+    return pn
 
 
 # ============================================================================
-# Haar DWT / IDWT  (pure numpy, no pywt dependency)
+# Haar DWT / IDWT  (numpy or numba, no pywt dependency)
 # ============================================================================
+_haar_dwt2_nb = None
+_haar_idwt2_nb = None
+
+if njit is not None:
+    # Same butterfly as the NumPy path, one pass over the image with row
+    # pairs spread across cores.  No fastmath: it would allow the additions
+    # to be reassociated and the result to drift from the NumPy path.  No
+    # on-disk cache either: the image's site-packages may be read-only, so
+    # the kernels are compiled on first use (about a second per process).
+    @njit(parallel=True)
+    def _haar_dwt2_nb(x, ll, lh, hl, hh):  # type: ignore[no-untyped-def]
+        for i in prange(ll.shape[0]):
+            for j in range(ll.shape[1]):
+                for k in range(ll.shape[2]):
+                    a, b = x[2 * i, 2 * j, k], x[2 * i, 2 * j + 1, k]
+                    c, d = x[2 * i + 1, 2 * j, k], x[2 * i + 1, 2 * j + 1, k]
+                    s0, d0 = a + b, a - b
+                    s1, d1 = c + d, c - d
+                    ll[i, j, k] = (s0 + s1) * 0.25
+                    lh[i, j, k] = (s0 - s1) * 0.25
+                    hl[i, j, k] = (d0 + d1) * 0.25
+                    hh[i, j, k] = (d0 - d1) * 0.25
+
+    @njit(parallel=True)
+    def _haar_idwt2_nb(ll, lh, hl, hh, out):  # type: ignore[no-untyped-def]
+        for i in prange(ll.shape[0]):
+            for j in range(ll.shape[1]):
+                for k in range(ll.shape[2]):
+                    lo0, lo1 = ll[i, j, k] + lh[i, j, k], ll[i, j, k] - lh[i, j, k]
+                    hi0, hi1 = hl[i, j, k] + hh[i, j, k], hl[i, j, k] - hh[i, j, k]
+                    out[2 * i, 2 * j, k] = lo0 + hi0
+                    out[2 * i, 2 * j + 1, k] = lo0 - hi0
+                    out[2 * i + 1, 2 * j, k] = lo1 + hi1
+                    out[2 * i + 1, 2 * j + 1, k] = lo1 - hi1
+
+
 def _haar_dwt2(x: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    """2D Haar DWT.  Input: [H, W].  Returns (LL, LH, HL, HH) each [H/2, W/2]."""
-    h, w = x.shape
-    # Rows
-    lo = (x[:, 0::2] + x[:, 1::2]) / 2.0
-    hi = (x[:, 0::2] - x[:, 1::2]) / 2.0
-    # Columns
-    ll = (lo[0::2, :] + lo[1::2, :]) / 2.0
-    lh = (lo[0::2, :] - lo[1::2, :]) / 2.0
-    hl = (hi[0::2, :] + hi[1::2, :]) / 2.0
-    hh = (hi[0::2, :] - hi[1::2, :]) / 2.0
+    """2D Haar DWT over all channels.  Input: [H, W, C].
+
+    Returns (LL, LH, HL, HH) each [H/2, W/2, C].  Each 2×2 pixel block
+    ``[[a, b], [c, d]]`` is read through one ``[H/2, 2, W/2, 2, C]`` view and
+    turned into the four sub-band coefficients with a single butterfly; the
+    outputs are contiguous.  Uses the numba kernel when numba is installed.
+    """
+    h, w, c = x.shape
+    if _haar_dwt2_nb is not None:
+        bands = tuple(np.empty((h // 2, w // 2, c), dtype=x.dtype) for _ in range(4))
+        _haar_dwt2_nb(x, *bands)
+        return bands  # type: ignore[return-value]
+
+    blk = x.reshape(h // 2, 2, w // 2, 2, c)
+    top_l, top_r = blk[:, 0, :, 0], blk[:, 0, :, 1]
+    bot_l, bot_r = blk[:, 1, :, 0], blk[:, 1, :, 1]
+    # row pass (sum / difference of horizontal pairs), then column pass
+    s0, d0 = top_l + top_r, top_l - top_r
+    s1, d1 = bot_l + bot_r, bot_l - bot_r
+    ll = (s0 + s1) * 0.25
+    lh = (s0 - s1) * 0.25
+    hl = (d0 + d1) * 0.25
+    hh = (d0 - d1) * 0.25
     return ll, lh, hl, hh
 
 
 def _haar_idwt2(ll: np.ndarray, lh: np.ndarray, hl: np.ndarray, hh: np.ndarray) -> np.ndarray:
-    """2D Haar IDWT.  Inverse of _haar_dwt2."""
-    h2, w2 = ll.shape
-    h, w = h2 * 2, w2 * 2
-    # Reconstruct columns
-    lo = np.zeros((h, w2), dtype=np.float64)
-    hi = np.zeros((h, w2), dtype=np.float64)
-    lo[0::2, :] = ll + lh
-    lo[1::2, :] = ll - lh
-    hi[0::2, :] = hl + hh
-    hi[1::2, :] = hl - hh
-    # Reconstruct rows
-    result = np.zeros((h, w), dtype=np.float64)
-    result[:, 0::2] = lo + hi
-    result[:, 1::2] = lo - hi
+    """2D Haar IDWT over all channels.  Inverse of _haar_dwt2."""
+    h2, w2, c = ll.shape
+    dtype = np.result_type(ll, lh, hl, hh)
+    result = np.empty((h2 * 2, w2 * 2, c), dtype=dtype)
+    if _haar_idwt2_nb is not None:
+        _haar_idwt2_nb(ll, lh, hl, hh, result)
+        return result
+
+    # column pass, then write each 2×2 block straight into the output
+    lo0, lo1 = ll + lh, ll - lh
+    hi0, hi1 = hl + hh, hl - hh
+    blk = result.reshape(h2, 2, w2, 2, c)
+    np.add(lo0, hi0, out=blk[:, 0, :, 0])
+    np.subtract(lo0, hi0, out=blk[:, 0, :, 1])
+    np.add(lo1, hi1, out=blk[:, 1, :, 0])
+    np.subtract(lo1, hi1, out=blk[:, 1, :, 1])
     return result
 
 
@@ -118,75 +198,185 @@ def _embed_dwt(
     image: Image.Image,
     watermark_id: str,
     strength: float = _EMBED_STRENGTH,
+    dwt_levels: int = 1,
 ) -> Image.Image:
-    """Embed 128-bit watermark into the HL sub-band of each colour channel."""
-    img = np.array(image, dtype=np.float64)
-    h, w, c = img.shape
-    # ensure even dims
-    eh, ew = (h // 2) * 2, (w // 2) * 2
-    img = img[:eh, :ew, :]
+    """Embed 128-bit watermark into the HL sub-band of each colour channel.
 
-    bits = _id_to_bits(watermark_id)  # [128] in {-1, +1}
+    With ``dwt_levels > 1`` the LL band is decomposed again and the deepest
+    HL band is used: 4× fewer coefficients per level and lower frequencies,
+    which survive JPEG better.  Extraction must use the same level.
+    """
+    if dwt_levels < 1:
+        raise ValueError(f"dwt_levels must be >= 1, got {dwt_levels}")
+    pixels = np.asarray(image)
+    h, w, c = pixels.shape
+    # ensure dims divisible by 2**levels; trim and upcast in a single copy
+    block = 1 << dwt_levels
+    eh, ew = h - h % block, w - w % block
+    img = pixels[:eh, :ew, :].astype(np.float32)
 
-    for ch in range(c):
-        ll, lh, hl, hh = _haar_dwt2(img[:, :, ch])
-        sub_h, sub_w = hl.shape
-        capacity = sub_h * sub_w
-        if capacity < WATERMARK_BITS:
-            logger.warning("Image too small for DWT watermark (%d < %d)", capacity, WATERMARK_BITS)
-            continue
+    bits = _id_to_bits(watermark_id)  # [128] in {-1, +1}
 
-        # Spread each bit across multiple coefficients
+    ll = img
+    details = []
+    for _ in range(dwt_levels):
+        ll, lh, hl, hh = _haar_dwt2(ll)
+        details.append((lh, hl, hh))
+    sub_h, sub_w, _ = hl.shape
+    capacity = sub_h * sub_w
+    if capacity < WATERMARK_BITS:
+        logger.warning("Image too small for DWT watermark (%d < %d)", capacity, WATERMARK_BITS)
+    else:
+        # Spread each bit across multiple coefficients: bit b owns the chip
+        # span [b*cpb, (b+1)*cpb) of each channel's flattened sub-band.
+        # On a contiguous band the reshape is a view, so the chips are added
+        # in place.  _haar_dwt2 already returns contiguous bands; the copy
+        # below only happens if that ever changes.
         chips_per_bit = capacity // WATERMARK_BITS
-        flat = hl.ravel()
-
-        for b in range(WATERMARK_BITS):
-            start = b * chips_per_bit
-            end = start + chips_per_bit
-            pn = _pn_sequence(_CHIP_SEED_BASE + b, chips_per_bit)
-            flat[start:end] += strength * bits[b] * pn
-
-        hl = flat.reshape(sub_h, sub_w)
-        img[:, :, ch] = _haar_idwt2(ll, lh, hl, hh)
-
-    img = np.clip(img, 0, 255).astype(np.uint8)
-    result = Image.fromarray(img)
-    # restore original dims if they were trimmed
-    if (result.size[0], result.size[1]) != (w, h):
-        result = result.resize((w, h), Image.LANCZOS)
-    return result
-
-
-def _extract_dwt(image: Image.Image) -> np.ndarray:
+        hl = np.ascontiguousarray(hl)
+        details[-1] = (lh, hl, hh)
+        spans = hl.reshape(capacity, c)[:WATERMARK_BITS * chips_per_bit]
+        spans = spans.reshape(WATERMARK_BITS, chips_per_bit, c)
+        spans += ((strength * bits)[:, None] * _pn_matrix(chips_per_bit))[:, :, None]
+
+        for lh, hl, hh in reversed(details):
+            ll = _haar_idwt2(ll, lh, hl, hh)
+        img = ll
+
+    np.clip(img, 0, 255, out=img)
+    if (eh, ew) == (h, w):
+        return Image.fromarray(img.astype(np.uint8))
+    # rows/columns trimmed off for the transform are passed through as-is
+    out = pixels.copy()
+    out[:eh, :ew] = img
+    return Image.fromarray(out)
+
+
+def _extract_dwt(image: Image.Image, dwt_levels: int = 1) -> np.ndarray:
     """Extract 128 soft-decision values from the HL sub-band.
 
+    *dwt_levels* must match the value used when embedding.
     Returns array of shape [128]. Positive = bit 1, negative = bit 0.
     """
-    img = np.array(image, dtype=np.float64)
-    h, w, c = img.shape
-    eh, ew = (h // 2) * 2, (w // 2) * 2
-    img = img[:eh, :ew, :]
+    if dwt_levels < 1:
+        raise ValueError(f"dwt_levels must be >= 1, got {dwt_levels}")
+    pixels = np.asarray(image)
+    h, w, c = pixels.shape
+    block = 1 << dwt_levels
+    eh, ew = h - h % block, w - w % block
+    img = pixels[:eh, :ew, :].astype(np.float32)
+
+    accum = np.zeros(WATERMARK_BITS, dtype=np.float32)
+
+    ll = img
+    for _ in range(dwt_levels):
+        ll, _, hl, _ = _haar_dwt2(ll)
+    sub_h, sub_w, _ = hl.shape
+    capacity = sub_h * sub_w
+    if capacity < WATERMARK_BITS:
+        return accum
+
+    chips_per_bit = capacity // WATERMARK_BITS
+    flat = hl.reshape(capacity, c)
+
+    # correlate every bit span of every channel with its chips in one sweep
+    spans = flat[:WATERMARK_BITS * chips_per_bit].reshape(WATERMARK_BITS, chips_per_bit, c)
+    accum += np.einsum("bic,bi->b", spans, _pn_matrix(chips_per_bit)) / chips_per_bit
 
-    accum = np.zeros(WATERMARK_BITS, dtype=np.float64)
+    return accum
 
-    for ch in range(c):
-        _, _, hl, _ = _haar_dwt2(img[:, :, ch])
-        sub_h, sub_w = hl.shape
-        capacity = sub_h * sub_w
-        if capacity < WATERMARK_BITS:
-            continue
 
-        chips_per_bit = capacity // WATERMARK_BITS
-        flat = hl.ravel()
+# ============================================================================
+# DWT watermark on torch tensors  (same transform and chip layout as above)
+# Lets a pipeline that already holds the image on the GPU embed / extract
+# without a round trip through PIL and NumPy.  Torch is imported lazily.
+# ============================================================================
+def _haar_filters(device):  # type: ignore[no-untyped-def]
+    """[4, 1, 2, 2] analysis filters (LL, LH, HL, HH) matching _haar_dwt2."""
+    import torch
 
-        for b in range(WATERMARK_BITS):
-            start = b * chips_per_bit
-            end = start + chips_per_bit
-            pn = _pn_sequence(_CHIP_SEED_BASE + b, chips_per_bit)
-            corr = np.dot(flat[start:end], pn) / chips_per_bit
-            accum[b] += corr
+    return torch.tensor(
+        [
+            [[1.0, 1.0], [1.0, 1.0]],     # LL
+            [[1.0, 1.0], [-1.0, -1.0]],   # LH
+            [[1.0, -1.0], [1.0, -1.0]],   # HL
+            [[1.0, -1.0], [-1.0, 1.0]],   # HH
+        ],
+        dtype=torch.float32,
+        device=device,
+    ).unsqueeze(1) * 0.25
 
-    return accum
+
+@functools.lru_cache(maxsize=8)
+def _pn_matrix_torch(chips_per_bit: int, device):  # type: ignore[no-untyped-def]
+    """_pn_matrix uploaded once per (chip count, device)."""
+    import torch
+
+    return torch.from_numpy(_pn_matrix(chips_per_bit).copy()).to(device)
+
+
+def _embed_dwt_torch(x, watermark_id: str, strength: float = _EMBED_STRENGTH):  # type: ignore[no-untyped-def]
+    """Embed into a ``[C, H, W]`` tensor in pixel units (0–255).
+
+    The Haar transform is linear and only the HL band changes, so the
+    analysis/synthesis round trip is skipped: a change of *d* in an HL
+    coefficient moves its 2×2 pixel block by ``[[+d, -d], [+d, -d]]``.  The
+    embed is therefore one broadcast add of the chip offsets over the image,
+    plus the clamp.  On integer pixels every intermediate of the transform
+    path is a multiple of 1/4, so both give exactly the same floats.
+    Returns a new float tensor clamped to [0, 255] on the same device; an
+    odd last row/column is passed through unchanged.
+    """
+    import torch
+
+    c, h, w = x.shape
+    eh, ew = (h // 2) * 2, (w // 2) * 2
+    sub_h, sub_w = eh // 2, ew // 2
+    capacity = sub_h * sub_w
+    if capacity < WATERMARK_BITS:
+        logger.warning("Image too small for DWT watermark (%d < %d)", capacity, WATERMARK_BITS)
+        return x.to(torch.float32, copy=True).clamp_(0.0, 255.0)
+
+    # HL offsets in the flattened sub-band layout (bit b owns chip span
+    # [b*cpb, (b+1)*cpb)); the tail past 128*cpb is left unmarked
+    chips_per_bit = capacity // WATERMARK_BITS
+    bits = torch.from_numpy(_id_to_bits(watermark_id)).to(x.device)
+    hl_delta = torch.zeros(capacity, dtype=torch.float32, device=x.device)
+    hl_delta[:WATERMARK_BITS * chips_per_bit] = (
+        (strength * bits)[:, None] * _pn_matrix_torch(chips_per_bit, x.device)
+    ).reshape(-1)
+    # [sub_h, 1, sub_w, 2]: +d on even columns, -d on odd, same for both rows
+    d = hl_delta.view(sub_h, 1, sub_w, 1)
+    block_delta = torch.cat((d, -d), dim=3)
+
+    # splitting dims is always a view, even when the odd edge is trimmed
+    blocks = x[:, :eh, :ew].unflatten(2, (sub_w, 2)).unflatten(1, (sub_h, 2))
+    marked = (blocks + block_delta).clamp_(0.0, 255.0).reshape(c, eh, ew)
+    if (eh, ew) == (h, w):
+        return marked
+    out = x.to(torch.float32, copy=True).clamp_(0.0, 255.0)
+    out[:, :eh, :ew] = marked
+    return out
+
+
+def _extract_dwt_torch(x) -> np.ndarray:  # type: ignore[no-untyped-def]
+    """Soft bits from a float ``[C, H, W]`` tensor in pixel units (0–255)."""
+    import torch.nn.functional as F
+
+    c, h, w = x.shape
+    eh, ew = (h // 2) * 2, (w // 2) * 2
+    capacity = (eh // 2) * (ew // 2)
+    if capacity < WATERMARK_BITS:
+        return np.zeros(WATERMARK_BITS, dtype=np.float32)
+
+    filters = _haar_filters(x.device)[2:3]  # HL only
+    hl = F.conv2d(x[:, :eh, :ew].unsqueeze(1), filters, stride=2).reshape(c, capacity)
+
+    chips_per_bit = capacity // WATERMARK_BITS
+    spans = hl[:, :WATERMARK_BITS * chips_per_bit].view(c, WATERMARK_BITS, chips_per_bit)
+    # every channel carries the same chips, so sum channels before correlating
+    corr = (spans.sum(dim=0) * _pn_matrix_torch(chips_per_bit, x.device)).sum(dim=1) / chips_per_bit
+    return corr.cpu().numpy()
 
 
 # ============================================================================
@@ -194,8 +384,7 @@ def _extract_dwt(image: Image.Image) -> np.ndarray:
 # Torch is imported lazily so the DWT backend works without torch installed.
 # ============================================================================
 _NN_WEIGHTS_DIR = "weights/pixelseal"
-_nn_enc = None
-_nn_dec = None
+_nn_models: dict[str, tuple[object, object]] = {}
 
 
 def _build_nn_models(device):  # type: ignore[no-untyped-def]
@@ -221,9 +410,14 @@ def _build_nn_models(device):  # type: ignore[no-untyped-def]
             )
             self.strength = 0.03
 
-        def forward(self, image, bits):
-            b, _, h, w = image.shape
-            bm = self.prep(bits).view(b, 3, 32, 32)
+        @torch.jit.export
+        def project(self, bits):
+            """[B, 128] bits -> [B, 3, 32, 32] bit map (image-independent)."""
+            return self.prep(bits).view(bits.shape[0], 3, 32, 32)
+
+        @torch.jit.export
+        def embed(self, image, bm):
+            _, _, h, w = image.shape
             bm = F.interpolate(bm, size=(h, w), mode="bilinear", align_corners=False)
             x = torch.cat([image, bm], dim=1)
             feat = self.down(x)
@@ -231,6 +425,9 @@ def _build_nn_models(device):  # type: ignore[no-untyped-def]
             residual = F.interpolate(residual, size=(h, w), mode="bilinear", align_corners=False)
             return (image + residual * self.strength).clamp(0, 1)
 
+        def forward(self, image, bits):
+            return self.embed(image, self.project(bits))
+
     class _Decoder(nn.Module):
         def __init__(self) -> None:
             super().__init__()
@@ -252,33 +449,206 @@ def _build_nn_models(device):  # type: ignore[no-untyped-def]
     return _Encoder().to(device).eval(), _Decoder().to(device).eval()
 
 
-def _get_nn_models(device):  # type: ignore[no-untyped-def]
-    import os
+def _nn_key(device) -> str:  # type: ignore[no-untyped-def]
+    """Canonical cache key so ``"cuda"`` and ``"cuda:0"`` share one model pair."""
+    import torch
+
+    device = torch.device(device)
+    if device.type == "cuda" and device.index is None:
+        device = torch.device("cuda", torch.cuda.current_device())
+    return str(device)
+
+
+def _optimize_nn_model(model, methods: list[str] | None = None):  # type: ignore[no-untyped-def]
+    """Script and freeze *model* for inference (folds BatchNorm into the convs).
+
+    *methods* names exported methods besides ``forward`` to keep.  Falls back
+    to the eager module if TorchScript cannot handle it.
+    """
     import torch
 
-    global _nn_enc, _nn_dec
-    if _nn_enc is not None and _nn_dec is not None:
-        return _nn_enc, _nn_dec
+    try:
+        with torch.no_grad():
+            return torch.jit.optimize_for_inference(torch.jit.script(model), methods)
+    except Exception:
+        logger.warning("TorchScript optimisation failed; using eager module.", exc_info=True)
+        return model.requires_grad_(False)
 
-    _nn_enc, _nn_dec = _build_nn_models(device)
+
+def _image_to_input(image: Image.Image, device):  # type: ignore[no-untyped-def]
+    """RGB image -> ``[1, 3, H, W]`` float tensor in [0, 1] on *device*.
+
+    Uploads the raw uint8 pixels (a quarter of the float32 bytes) through
+    pinned memory and converts on the device.  The HWC layout makes the
+    result channels-last, which the CUDA models are set up for.
+    """
+    import torch
+
+    pixels = np.asarray(image)
+    on_cuda = torch.device(device).type == "cuda"
+    host = torch.empty(pixels.shape, dtype=torch.uint8, pin_memory=on_cuda)
+    host.numpy()[...] = pixels
+    x = host.to(device, non_blocking=on_cuda).permute(2, 0, 1).unsqueeze(0)
+    return x.float().div_(255.0)
+
+
+def _nn_autocast(device):  # type: ignore[no-untyped-def]
+    """fp16 autocast on CUDA (pure forward passes), otherwise a no-op (fp32).
+
+    The weight-cast cache is off: a decoder graph captured under it would
+    record the cached fp16 weight copies, which are freed when the autocast
+    block exits, and every later replay would read freed memory.
+    """
+    import torch
+
+    if torch.device(device).type == "cuda":
+        return torch.autocast(device_type="cuda", dtype=torch.float16, cache_enabled=False)
+    return contextlib.nullcontext()
+
+
+def _get_nn_models(device):  # type: ignore[no-untyped-def]
+    import torch
+
+    key = _nn_key(device)
+    if key in _nn_models:
+        return _nn_models[key]
 
     enc_path = os.path.join(_NN_WEIGHTS_DIR, "encoder.pt")
     dec_path = os.path.join(_NN_WEIGHTS_DIR, "decoder.pt")
 
-    if os.path.isfile(enc_path) and os.path.isfile(dec_path):
-        _nn_enc.load_state_dict(torch.load(enc_path, map_location=device, weights_only=True))
-        _nn_dec.load_state_dict(torch.load(dec_path, map_location=device, weights_only=True))
-        logger.info("PixelSeal NN weights loaded from %s", _NN_WEIGHTS_DIR)
-    else:
-        _nn_enc = None
-        _nn_dec = None
+    if not (os.path.isfile(enc_path) and os.path.isfile(dec_path)):
         raise ValueError(
             f"PixelSeal NN weights not found at {_NN_WEIGHTS_DIR}. "
             "The NN backend requires pretrained encoder.pt and decoder.pt. "
             "Use backend='dwt' instead, or train and place weights."
         )
 
-    return _nn_enc, _nn_dec
+    enc, dec = _build_nn_models(device)
+    enc.load_state_dict(torch.load(enc_path, map_location=device, weights_only=True))
+    dec.load_state_dict(torch.load(dec_path, map_location=device, weights_only=True))
+    logger.info("PixelSeal NN weights loaded from %s", _NN_WEIGHTS_DIR)
+
+    if torch.device(device).type == "cuda":
+        # NHWC lets cuDNN use its native channels-last conv kernels
+        enc = enc.to(memory_format=torch.channels_last)
+        dec = dec.to(memory_format=torch.channels_last)
+
+    _nn_models[key] = (_optimize_nn_model(enc, ["project", "embed"]), _optimize_nn_model(dec))
+    return _nn_models[key]
+
+
+# At most this many input shapes get a captured decoder graph; each one keeps
+# its own static buffers, so arbitrary image sizes fall back to eager calls.
+_DECODER_GRAPHS_MAX = 8
+_decoder_graphs: dict[tuple[int, tuple[int, ...]], tuple[object, object, object]] = {}
+
+
+def _capture_decoder(decoder, x):  # type: ignore[no-untyped-def]
+    """Capture one *decoder* forward at *x*'s shape into a CUDA graph.
+
+    Runs under :func:`_nn_autocast`, whose weight-cast cache is disabled, so
+    the graph only records buffers that outlive the capture.
+    """
+    import torch
+
+    static_in = x.clone()
+    # warm up on a side stream so lazy cuDNN / allocator work is not captured
+    side = torch.cuda.Stream(device=x.device)
+    side.wait_stream(torch.cuda.current_stream(x.device))
+    with torch.cuda.stream(side):
+        for _ in range(3):
+            decoder(static_in)
+    torch.cuda.current_stream(x.device).wait_stream(side)
+
+    graph = torch.cuda.CUDAGraph()
+    with torch.cuda.graph(graph):
+        static_out = decoder(static_in)
+    return graph, static_in, static_out
+
+
+def _decode(decoder, x):  # type: ignore[no-untyped-def]
+    """Run *decoder* on *x*, replaying a captured CUDA graph per input shape.
+
+    The decoder is a short fixed chain of small kernels, so on CUDA the
+    per-launch overhead dominates; a graph replays the chain in one launch.
+    Must be called under the same inference/autocast context every time.
+    """
+    if not x.is_cuda:
+        return decoder(x)
+
+    key = (id(decoder), tuple(x.shape))
+    entry = _decoder_graphs.get(key)
+    if entry is None:
+        if len(_decoder_graphs) >= _DECODER_GRAPHS_MAX:
+            return decoder(x)
+        try:
+            entry = _capture_decoder(decoder, x)
+        except Exception:
+            logger.warning("CUDA graph capture failed; decoding eagerly.", exc_info=True)
+            return decoder(x)
+        _decoder_graphs[key] = entry
+
+    graph, static_in, static_out = entry
+    static_in.copy_(x)  # type: ignore[attr-defined]
+    graph.replay()  # type: ignore[attr-defined]
+    return static_out.clone()  # type: ignore[attr-defined]
+
+
+@functools.lru_cache(maxsize=1024)
+def _encoder_bit_map(encoder, watermark_id: str, device):  # type: ignore[no-untyped-def]
+    """Projected bit map for *watermark_id*, cached per encoder.
+
+    The projection depends only on the ID, so repeated embeds of one ID
+    (a user's whole upload batch) skip the MLP.  Kept in fp32 on *device*.
+    """
+    import torch
+
+    # the encoder takes {0, 1} bits
+    bits = torch.from_numpy(_id_to_bits(watermark_id) > 0).float().unsqueeze(0).to(device)
+    with torch.inference_mode():
+        return encoder.project(bits)
+
+
+def _logits_to_ids(logits) -> list[str]:  # type: ignore[no-untyped-def]
+    """``[B, 128]`` decoder logits -> B 32-char hex IDs, packed on device.
+
+    ``sigmoid(l) > 0.5`` is ``l > 0``.  Bits are packed LSB-first into 16
+    bytes per row (the :func:`_id_to_bits` order), so only 16 bytes per image
+    reach the host.
+    """
+    import torch
+
+    bits = (logits.reshape(-1, WATERMARK_BITS // 8, 8) > 0).to(torch.int32)
+    weights = torch.tensor([1 << i for i in range(8)], dtype=torch.int32, device=logits.device)
+    packed = (bits * weights).sum(dim=2).to(torch.uint8).cpu().numpy()
+    # byte 0 holds bits 0-7; the hex ID is the big-endian form of the value
+    return [row[::-1].tobytes().hex() for row in packed]
+
+
+def _map_dwt(fn, *iterables) -> list:  # type: ignore[no-untyped-def]
+    """``list(map(fn, *iterables))`` for batched DWT work.
+
+    The numba kernels already spread each image over all cores and their
+    default threading layer must only be entered from one thread, so with
+    numba the images run one at a time in the caller's thread.  The NumPy
+    kernels release the GIL, so they run in parallel on a thread pool.
+    """
+    if _haar_dwt2_nb is not None:
+        return list(map(fn, *iterables))
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        return list(pool.map(fn, *iterables))
+
+
+def _size_buckets(images: list[Image.Image], batch_size: int) -> list[list[int]]:
+    """Indices of *images* grouped by size, in chunks of at most *batch_size*."""
+    by_size: dict[tuple[int, int], list[int]] = {}
+    for i, image in enumerate(images):
+        by_size.setdefault(image.size, []).append(i)
+    return [
+        idx[start:start + batch_size]
+        for idx in by_size.values()
+        for start in range(0, len(idx), batch_size)
+    ]
 
 
 # ============================================================================
@@ -292,6 +662,7 @@ def embed_watermark(
     *,
     backend: str | SealBackend = SealBackend.DWT,
     device: "torch.device | None" = None,
+    dwt_levels: int = 1,
 ) -> Image.Image:
     """Embed an invisible 128-bit watermark into *image*.
 
@@ -300,6 +671,8 @@ def embed_watermark(
         watermark_id: 32-char hex string.
         backend: ``"dwt"`` (default, deterministic) or ``"nn"`` (learned).
         device: Torch device (NN backend only).
+        dwt_levels: Haar decomposition depth (DWT backend only).  Level 2
+            is more robust to JPEG; extraction must use the same value.
 
     Returns:
         Watermarked PIL Image.
@@ -307,31 +680,26 @@ def embed_watermark(
     backend = SealBackend(backend)
 
     if backend is SealBackend.DWT:
-        result = _embed_dwt(image, watermark_id)
-        logger.info("Watermark embedded (DWT, id=%s...)", watermark_id[:8])
+        result = _embed_dwt(image, watermark_id, dwt_levels=dwt_levels)
+        logger.debug("Watermark embedded (DWT, id=%s...)", watermark_id[:8])
         return result
 
     # NN backend — torch imported lazily
     import torch
-    from torchvision import transforms
 
     if device is None:
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     encoder, _ = _get_nn_models(device)
 
-    x = transforms.ToTensor()(image).unsqueeze(0).to(device)
-    bits_val = int(watermark_id[:32], 16)
-    bits = torch.tensor(
-        [(bits_val >> i) & 1 for i in range(WATERMARK_BITS)],
-        dtype=torch.float32,
-    ).unsqueeze(0).to(device)
+    x = _image_to_input(image, device)
+    bit_map = _encoder_bit_map(encoder, watermark_id[:32].lower(), _nn_key(device))
 
-    with torch.no_grad():
-        wm = encoder(x, bits)
+    with torch.inference_mode(), _nn_autocast(device):
+        wm = encoder.embed(x, bit_map)
 
-    arr = (wm.squeeze(0).cpu().numpy() * 255).astype(np.uint8)
+    arr = (wm.float().clamp(0, 1).squeeze(0).cpu().numpy() * 255).astype(np.uint8)
     result = Image.fromarray(arr.transpose(1, 2, 0))
-    logger.info("Watermark embedded (NN, id=%s...)", watermark_id[:8])
+    logger.debug("Watermark embedded (NN, id=%s...)", watermark_id[:8])
     return result
 
 
@@ -340,6 +708,7 @@ def extract_watermark(
     *,
     backend: str | SealBackend = SealBackend.DWT,
     device: "torch.device | None" = None,
+    dwt_levels: int = 1,
 ) -> str:
     """Extract watermark ID from *image*.
 
@@ -347,6 +716,7 @@ def extract_watermark(
         image: Possibly watermarked PIL Image (RGB).
         backend: Must match the backend used for embedding.
         device: Torch device (NN backend only).
+        dwt_levels: Must match the value used for embedding (DWT only).
 
     Returns:
         Extracted 32-char hex watermark ID.
@@ -354,47 +724,170 @@ def extract_watermark(
     backend = SealBackend(backend)
 
     if backend is SealBackend.DWT:
-        soft = _extract_dwt(image)
+        soft = _extract_dwt(image, dwt_levels=dwt_levels)
         wm_id = _bits_to_id(soft)
-        logger.info("Watermark extracted (DWT, id=%s...)", wm_id[:8])
+        logger.debug("Watermark extracted (DWT, id=%s...)", wm_id[:8])
         return wm_id
 
     # NN backend
     import torch
-    from torchvision import transforms
 
     if device is None:
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     _, decoder = _get_nn_models(device)
 
-    x = transforms.ToTensor()(image).unsqueeze(0).to(device)
-    with torch.no_grad():
-        logits = decoder(x)
-        hard = (torch.sigmoid(logits) > 0.5).float().squeeze(0).cpu().numpy()
+    x = _image_to_input(image, device)
+    with torch.inference_mode(), _nn_autocast(device):
+        logits = _decode(decoder, x)
 
-    wm_id = _bits_to_id(hard)
-    logger.info("Watermark extracted (NN, id=%s...)", wm_id[:8])
+    wm_id = _logits_to_ids(logits)[0]
+    logger.debug("Watermark extracted (NN, id=%s...)", wm_id[:8])
     return wm_id
 
 
 def verify_watermark(
-    image: Image.Image,
+    image: Image.Image | None,
     expected_id: str,
     *,
     backend: str | SealBackend = SealBackend.DWT,
     device: "torch.device | None" = None,
+    dwt_levels: int = 1,
+    extracted_id: str | None = None,
 ) -> tuple[bool, float]:
     """Verify whether *image* contains the expected watermark.
 
+    Pass *extracted_id* if the caller has already run
+    :func:`extract_watermark` on *image*, to skip extracting it again;
+    *image* may then be ``None``.
+
     Returns:
         (match, bit_accuracy) — match is True if accuracy >= 0.75.
     """
-    extracted = extract_watermark(image, backend=backend, device=device)
+    extracted = extracted_id
+    if extracted is None:
+        if image is None:
+            raise ValueError("verify_watermark needs an image or extracted_id")
+        extracted = extract_watermark(image, backend=backend, device=device, dwt_levels=dwt_levels)
     expected_val = int(expected_id[:32], 16)
     extracted_val = int(extracted, 16)
     xor = expected_val ^ extracted_val
-    wrong = bin(xor).count("1")
+    wrong = xor.bit_count()
     accuracy = (WATERMARK_BITS - wrong) / WATERMARK_BITS
     match = accuracy >= 0.75
-    logger.info("Watermark verify: accuracy=%.1f%% match=%s", accuracy * 100, match)
+    logger.debug("Watermark verify: accuracy=%.1f%% match=%s", accuracy * 100, match)
     return match, accuracy
+
+
+def embed_watermarks(
+    images: list[Image.Image],
+    watermark_ids: list[str],
+    *,
+    backend: str | SealBackend = SealBackend.DWT,
+    device: "torch.device | None" = None,
+    dwt_levels: int = 1,
+    batch_size: int = 8,
+) -> list[Image.Image]:
+    """Embed ``watermark_ids[i]`` into ``images[i]`` for every image.
+
+    Same arguments as :func:`embed_watermark`.  DWT images are processed in
+    parallel; NN images are grouped by size and run through the encoder
+    ``batch_size`` at a time.  Results are returned in input order.
+    """
+    if len(images) != len(watermark_ids):
+        raise ValueError(f"{len(images)} images but {len(watermark_ids)} watermark IDs")
+    backend = SealBackend(backend)
+    if not images:
+        return []
+
+    if backend is SealBackend.DWT:
+        results = _map_dwt(
+            lambda image, wm_id: _embed_dwt(image, wm_id, dwt_levels=dwt_levels),
+            images, watermark_ids,
+        )
+        logger.debug("Watermarks embedded (DWT, %d images)", len(results))
+        return results
+
+    import torch
+
+    if device is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    encoder, _ = _get_nn_models(device)
+    key = _nn_key(device)
+
+    out: list[Image.Image | None] = [None] * len(images)
+    for idx in _size_buckets(images, batch_size):
+        x = torch.cat([_image_to_input(images[i], device) for i in idx])
+        bit_map = torch.cat([
+            _encoder_bit_map(encoder, watermark_ids[i][:32].lower(), key) for i in idx
+        ])
+        with torch.inference_mode(), _nn_autocast(device):
+            wm = encoder.embed(x, bit_map)
+        arr = (wm.float().clamp(0, 1) * 255).to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+        for j, i in enumerate(idx):
+            out[i] = Image.fromarray(arr[j])
+    logger.debug("Watermarks embedded (NN, %d images)", len(images))
+    return out  # type: ignore[return-value]
+
+
+def extract_watermarks(
+    images: list[Image.Image],
+    *,
+    backend: str | SealBackend = SealBackend.DWT,
+    device: "torch.device | None" = None,
+    dwt_levels: int = 1,
+    batch_size: int = 8,
+) -> list[str]:
+    """Extract the watermark ID of every image, in input order.
+
+    Same arguments as :func:`extract_watermark`; batched like
+    :func:`embed_watermarks`.
+    """
+    backend = SealBackend(backend)
+    if not images:
+        return []
+
+    if backend is SealBackend.DWT:
+        soft = _map_dwt(lambda image: _extract_dwt(image, dwt_levels=dwt_levels), images)
+        logger.debug("Watermarks extracted (DWT, %d images)", len(soft))
+        return [_bits_to_id(s) for s in soft]
+
+    import torch
+
+    if device is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    _, decoder = _get_nn_models(device)
+
+    ids: list[str] = [""] * len(images)
+    for idx in _size_buckets(images, batch_size):
+        x = torch.cat([_image_to_input(images[i], device) for i in idx])
+        with torch.inference_mode(), _nn_autocast(device):
+            logits = _decode(decoder, x)
+        for i, wm_id in zip(idx, _logits_to_ids(logits)):
+            ids[i] = wm_id
+    logger.debug("Watermarks extracted (NN, %d images)", len(images))
+    return ids
+
+
+def embed_watermark_tensor(x, watermark_id: str):  # type: ignore[no-untyped-def]
+    """DWT-embed *watermark_id* into a uint8 ``[3, H, W]`` tensor.
+
+    Same transform and chip layout as :func:`embed_watermark` with the DWT
+    backend at ``dwt_levels=1``, computed on the tensor's device; returns a
+    uint8 tensor there, so a GPU pipeline can go straight on to Mist.
+    """
+    import torch
+
+    result = _embed_dwt_torch(x, watermark_id[:32].lower()).to(torch.uint8)
+    logger.debug("Watermark embedded (DWT tensor, id=%s...)", watermark_id[:8])
+    return result
+
+
+def extract_watermark_tensor(x) -> str:  # type: ignore[no-untyped-def]
+    """Extract the DWT watermark ID from a uint8 ``[3, H, W]`` tensor.
+
+    Counterpart of :func:`embed_watermark_tensor`; pass the result to
+    :func:`verify_watermark` as *extracted_id*.
+    """
+    wm_id = _bits_to_id(_extract_dwt_torch(x.float()))
+    logger.debug("Watermark extracted (DWT tensor, id=%s...)", wm_id[:8])
+    return wm_id
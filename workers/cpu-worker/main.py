@@ -13,20 +13,19 @@ This worker runs on Railway and handles Free plan users (max 5 images/month).
 """
 from __future__ import annotations
 
+import io
 import json
 import logging
 import os
 import platform
 import signal
 import sys
-import tempfile
 import threading
 import time
 import traceback
 import uuid
 from datetime import datetime, timezone
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from pathlib import Path
 from typing import Any
 
 import redis
@@ -35,15 +34,15 @@ from PIL import Image
 from supabase import Client, create_client
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from core.c2pa_sign import sign_c2pa
+from core.c2pa_sign import sign_c2pa_bytes
 from core.mist.mist_v2 import apply_mist_v2
 from core.seal.pixelseal import embed_watermark, verify_watermark
-from core.storage import download_from_r2, upload_to_r2
+from core.storage import download_from_r2_bytes, upload_to_r2_bytes
 
 load_dotenv()
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
 logger = logging.getLogger("cpu-worker")
@@ -59,6 +58,13 @@ HEALTH_PORT: int = int(os.getenv("HEALTH_PORT", "8080"))
 # Mist v2 freq mode params (CPU-safe defaults — lighter than GPU VAE mode)
 MIST_EPSILON: int = int(os.getenv("MIST_EPSILON", "8"))
 MIST_STEPS: int = int(os.getenv("MIST_STEPS", "3"))
+# zlib level for the protected PNG (same default as the GPU worker)
+PNG_COMPRESS_LEVEL: int = int(os.getenv("PNG_COMPRESS_LEVEL", "1"))
+
+# tasks.error_log is capped at this many characters; tracebacks keep
+# only their innermost frames so the string is bounded before slicing
+ERROR_LOG_MAX: int = 4000
+TRACEBACK_FRAMES: int = 20
 
 # Must match apps/api/services/queue.py QUEUE_KEY
 QUEUE_KEY: str = "lore_anchor_tasks"
@@ -247,7 +253,7 @@ def _fail_task(sb: Client, task_id: str, error_msg: str) -> None:
     """Record an error on the task."""
     try:
         sb.table("tasks").update({
-            "error_log": error_msg[:4000],
+            "error_log": error_msg[:ERROR_LOG_MAX],
         }).eq("id", task_id).execute()
     except Exception:
         logger.exception("Failed to update task error_log for task_id=%s", task_id)
@@ -297,86 +303,83 @@ def process_image(
 
     watermark_id: str = uuid.uuid4().hex[:32]
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp = Path(tmpdir)
-        original_path = tmp / "original.png"
-        watermarked_path = tmp / "watermarked.png"
-        protected_path = tmp / "protected.png"
-        signed_path = tmp / "signed.png"
+    # Intermediates stay in memory; the result is encoded to PNG once, for
+    # signing and upload.
 
-        # --- Step: download ---
-        try:
-            logger.info("Step: download — fetching from R2: %s", original_r2_key)
-            download_from_r2(original_r2_key, str(original_path))
-            image = Image.open(original_path).convert("RGB")
-            logger.info("Step completed: download for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("download", exc) from exc
-
-        # --- Step: pixelseal (DWT — CPU only) ---
-        try:
-            logger.info("Step: pixelseal — embedding watermark (id=%s)", watermark_id)
-            # device=None means CPU path in pixelseal
-            watermarked = embed_watermark(image, watermark_id, backend="dwt")
-            watermarked.save(watermarked_path)
-            logger.info("Step completed: pixelseal for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("pixelseal", exc) from exc
-
-        # --- Step: mist_v2 (freq mode — NumPy DCT, no GPU) ---
-        try:
-            logger.info(
-                "Step: mist_v2 — applying freq perturbation (epsilon=%d, steps=%d)",
-                MIST_EPSILON,
-                MIST_STEPS,
-            )
-            protected = apply_mist_v2(
-                watermarked,
-                epsilon=MIST_EPSILON,
-                steps=MIST_STEPS,
-                mode="freq",  # CPU-safe: NumPy DCT, no VAE model
-            )
-            protected.save(protected_path)
-            logger.info("Step completed: mist_v2 (freq) for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("mist_v2", exc) from exc
+    # --- Step: download ---
+    try:
+        logger.info("Step: download — fetching from R2: %s", original_r2_key)
+        image = Image.open(io.BytesIO(download_from_r2_bytes(original_r2_key)))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        logger.info("Step completed: download for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("download", exc) from exc
+
+    # --- Step: pixelseal (DWT — CPU only) ---
+    try:
+        logger.info("Step: pixelseal — embedding watermark (id=%s)", watermark_id)
+        # device=None means CPU path in pixelseal
+        watermarked = embed_watermark(image, watermark_id, backend="dwt")
+        logger.info("Step completed: pixelseal for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("pixelseal", exc) from exc
+
+    # --- Step: mist_v2 (freq mode — NumPy DCT, no GPU) ---
+    try:
+        logger.info(
+            "Step: mist_v2 — applying freq perturbation (epsilon=%d, steps=%d)",
+            MIST_EPSILON,
+            MIST_STEPS,
+        )
+        protected = apply_mist_v2(
+            watermarked,
+            epsilon=MIST_EPSILON,
+            steps=MIST_STEPS,
+            mode="freq",  # CPU-safe: NumPy DCT, no VAE model
+        )
+        logger.info("Step completed: mist_v2 (freq) for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("mist_v2", exc) from exc
 
-        # --- Step: verify_watermark ---
-        try:
-            logger.info("Step: verify_watermark — checking watermark integrity")
-            match, accuracy = verify_watermark(protected, watermark_id, backend="dwt")
-            if not match:
-                raise RuntimeError(
-                    f"Watermark destroyed by Mist (accuracy={accuracy:.1%}). "
-                    "Image would be unprotected."
-                )
-            logger.info(
-                "Step completed: verify_watermark — accuracy=%.1f%% for image_id=%s",
-                accuracy * 100,
-                image_id,
+    # --- Step: verify_watermark ---
+    try:
+        logger.info("Step: verify_watermark — checking watermark integrity")
+        match, accuracy = verify_watermark(protected, watermark_id, backend="dwt")
+        if not match:
+            raise RuntimeError(
+                f"Watermark destroyed by Mist (accuracy={accuracy:.1%}). "
+                "Image would be unprotected."
             )
-        except RuntimeError:
-            raise
-        except Exception as exc:
-            raise PipelineStepError("verify_watermark", exc) from exc
-
-        # --- Step: c2pa_sign ---
-        c2pa_manifest: dict[str, Any] | None = None
-        try:
-            logger.info("Step: c2pa_sign — signing image")
-            c2pa_manifest = sign_c2pa(str(protected_path), str(signed_path))
-            logger.info("Step completed: c2pa_sign for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("c2pa_sign", exc) from exc
+        logger.info(
+            "Step completed: verify_watermark — accuracy=%.1f%% for image_id=%s",
+            accuracy * 100,
+            image_id,
+        )
+    except RuntimeError:
+        raise
+    except Exception as exc:
+        raise PipelineStepError("verify_watermark", exc) from exc
 
-        # --- Step: upload ---
-        try:
-            protected_r2_key = f"protected/{image_id}.png"
-            logger.info("Step: upload — uploading to R2: %s", protected_r2_key)
-            upload_to_r2(str(signed_path), protected_r2_key)
-            logger.info("Step completed: upload for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("upload", exc) from exc
+    # --- Step: c2pa_sign ---
+    c2pa_manifest: dict[str, Any] | None = None
+    try:
+        logger.info("Step: c2pa_sign — signing image")
+        png = io.BytesIO()
+        protected.save(png, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+        signed, c2pa_manifest = sign_c2pa_bytes(png.getvalue())
+        logger.info("Step completed: c2pa_sign for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("c2pa_sign", exc) from exc
+
+    # --- Step: upload ---
+    try:
+        protected_r2_key = f"protected/{image_id}.png"
+        logger.info("Step: upload — uploading to R2: %s", protected_r2_key)
+        upload_to_r2_bytes(signed, protected_r2_key)
+        logger.info("Step completed: upload for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("upload", exc) from exc
 
     return {
         "protected_r2_key": protected_r2_key,
@@ -500,7 +503,7 @@ def _run_consumer() -> None:
 
         except Exception:
             elapsed = time.monotonic() - t_start
-            error_detail = traceback.format_exc()
+            error_detail = traceback.format_exc(limit=-TRACEBACK_FRAMES)[-ERROR_LOG_MAX:]
             logger.exception(
                 "Pipeline failed (unexpected): image_id=%s (%.1fs elapsed)",
                 image_id,
@@ -3,10 +3,14 @@ R2 Storage helpers — Download/Upload via S3-compatible API (boto3).
 """
 from __future__ import annotations
 
+import io
 import logging
 import os
+import threading
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,22 +22,47 @@ _R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID", "")
 _R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY", "")
 _R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME", "")
 
+_MIB = 1024 * 1024
+
+# Objects up to 16 MiB (nearly every upload) go in a single request; larger
+# ones are split into 16 MiB parts moved over parallel ranged requests
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * _MIB,
+    multipart_chunksize=16 * _MIB,
+    max_concurrency=10,
+    use_threads=True,
+)
+
+# The worker's I/O pool runs several transfers at once, each with up to
+# max_concurrency part requests; the default pool of 10 would make them queue
+_CLIENT_CONFIG = Config(max_pool_connections=32, tcp_keepalive=True)
+
 _s3_client = None
+_s3_client_lock = threading.Lock()
 
 
 def _get_client():  # type: ignore[return]
-    """Lazy-init the boto3 S3 client for Cloudflare R2."""
+    """Lazy-init the boto3 S3 client for Cloudflare R2.
+
+    One client is shared by every thread (clients are thread-safe).  The
+    first transfers of a batch start together on the I/O pool, so creation
+    is locked: boto3's default session is not thread-safe, and racing
+    threads would each build their own client and connection pool.
+    """
     global _s3_client
     if _s3_client is not None:
         return _s3_client
 
-    _s3_client = boto3.client(
-        "s3",
-        endpoint_url=f"https://{_R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
-        aws_access_key_id=_R2_ACCESS_KEY_ID,
-        aws_secret_access_key=_R2_SECRET_ACCESS_KEY,
-        region_name="auto",
-    )
+    with _s3_client_lock:
+        if _s3_client is None:
+            _s3_client = boto3.client(
+                "s3",
+                endpoint_url=f"https://{_R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
+                aws_access_key_id=_R2_ACCESS_KEY_ID,
+                aws_secret_access_key=_R2_SECRET_ACCESS_KEY,
+                region_name="auto",
+                config=_CLIENT_CONFIG,
+            )
     return _s3_client
 
 
@@ -45,8 +74,8 @@ def download_from_r2(key: str, dest_path: str) -> None:
         dest_path: Local filesystem path to write the file to.
     """
     client = _get_client()
-    logger.info("R2 download: %s -> %s", key, dest_path)
-    client.download_file(_R2_BUCKET_NAME, key, dest_path)
+    logger.debug("R2 download: %s -> %s", key, dest_path)
+    client.download_file(_R2_BUCKET_NAME, key, dest_path, Config=_TRANSFER_CONFIG)
 
 
 def upload_to_r2(src_path: str, key: str) -> None:
@@ -57,5 +86,40 @@ def upload_to_r2(src_path: str, key: str) -> None:
         key: The R2 object key to store under.
     """
     client = _get_client()
-    logger.info("R2 upload: %s -> %s", src_path, key)
-    client.upload_file(src_path, _R2_BUCKET_NAME, key)
+    logger.debug("R2 upload: %s -> %s", src_path, key)
+    client.upload_file(src_path, _R2_BUCKET_NAME, key, Config=_TRANSFER_CONFIG)
+
+
+def download_from_r2_bytes(key: str) -> bytes:
+    """Download an object from R2 into memory.
+
+    Args:
+        key: The R2 object key.
+
+    Returns:
+        The object's contents.
+    """
+    client = _get_client()
+    logger.debug("R2 download: %s -> memory", key)
+    buf = io.BytesIO()
+    client.download_fileobj(_R2_BUCKET_NAME, key, buf, Config=_TRANSFER_CONFIG)
+    return buf.getvalue()
+
+
+def upload_to_r2_bytes(data: bytes, key: str, content_type: str = "image/png") -> None:
+    """Upload an in-memory object to R2.
+
+    Args:
+        data: The object's contents.
+        key: The R2 object key to store under.
+        content_type: ``Content-Type`` to store with the object.
+    """
+    client = _get_client()
+    logger.debug("R2 upload: memory (%d bytes) -> %s", len(data), key)
+    client.upload_fileobj(
+        io.BytesIO(data),
+        _R2_BUCKET_NAME,
+        key,
+        ExtraArgs={"ContentType": content_type},
+        Config=_TRANSFER_CONFIG,
+    )
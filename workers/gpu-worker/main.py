@@ -1,50 +1,76 @@
 """
 lore-anchor GPU Worker Entrypoint
 
-Pulls tasks from Redis queue (BLPOP on ``lore_anchor_tasks``), executes
-the defense pipeline:
+Pulls tasks from Redis queue (BLMOVE from ``lore_anchor_tasks`` onto this
+worker's ``lore_anchor_processing:<worker>`` list, then a Lua script that
+moves more for up to ``BATCH_WAIT_MS`` until ``BATCH_MAX`` tasks are in
+hand), executes the defense pipeline on the batch:
   Step 1: PixelSeal (invisible watermark)
   Step 2: Mist v2 (adversarial perturbation)
   Step 3: Verify watermark survived Mist
   Step 4: C2PA signing
 
-After processing, updates Supabase ``images`` status and records
-progress in the ``tasks`` table.
+A prefetch thread drains and downloads the next batch while the GPU
+works on the current one, and signing/upload finish on an I/O pool in the
+background.  As each image's upload completes, its Supabase ``images``
+status is updated, progress is recorded in the ``tasks`` table and the
+task is removed from the processing list.  Anything left on the list of a
+worker that died is re-queued when a worker next starts.
 """
 from __future__ import annotations
 
+import functools
+import io
 import json
 import logging
 import os
 import platform
+import queue
 import signal
+import socket
 import sys
-import tempfile
 import threading
 import time
 import traceback
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from pathlib import Path
-from typing import Any, cast
+from typing import Any, Callable, cast
 
+import httpx
+import numpy as np
 import redis
 import torch
 from dotenv import load_dotenv
 from PIL import Image
-from supabase import Client, create_client
-from tenacity import retry, stop_after_attempt, wait_exponential
+from supabase import Client, ClientOptions, create_client
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
-from core.c2pa_sign import sign_c2pa
-from core.mist.mist_v2 import apply_mist_v2
-from core.seal.pixelseal import embed_watermark, verify_watermark
-from core.storage import download_from_r2, upload_to_r2
+from core.c2pa_sign import sign_c2pa_bytes
+from core.mist.mist_v2 import apply_mist_v2_tensors
+from core.seal.pixelseal import embed_watermark_tensor, extract_watermark_tensor, verify_watermark
+from core.storage import download_from_r2_bytes, upload_to_r2_bytes
 
 load_dotenv()
 
+# Read by the CUDA caching allocator on first use, so it must be set before
+# any tensor reaches the GPU.  Images vary in size from task to task;
+# expandable segments let those allocations reuse one growing range instead
+# of fragmenting into fixed-size blocks.
+os.environ.setdefault(
+    "PYTORCH_CUDA_ALLOC_CONF",
+    "expandable_segments:True,max_split_size_mb:128,garbage_collection_threshold:0.8",
+)
+
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
 logger = logging.getLogger("gpu-worker")
@@ -55,14 +81,68 @@ logger = logging.getLogger("gpu-worker")
 REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
 MIST_EPSILON: int = int(os.getenv("MIST_EPSILON", "8"))
 MIST_STEPS: int = int(os.getenv("MIST_STEPS", "3"))
+# PGD step size as a multiple of epsilon / steps; raising it (e.g. 2.5 with
+# MIST_STEPS=2) reaches the edge of the epsilon ball in fewer steps
+MIST_ALPHA_SCALE: float = float(os.getenv("MIST_ALPHA_SCALE", "2.0"))
+# torch.compile the VAE encoder at startup (CUDA only).  "max-autotune"
+# adds minutes to boot; "reduce-overhead" skips the kernel autotuning but
+# still replays each step from a CUDA graph.  A coarser MIST_BUCKET keeps
+# the number of shapes to compile for small.
+MIST_COMPILE: bool = os.getenv("MIST_COMPILE", "0") == "1"
+MIST_COMPILE_MODE: str = os.getenv("MIST_COMPILE_MODE", "max-autotune")
 R2_PUBLIC_DOMAIN: str = os.getenv("R2_PUBLIC_DOMAIN", "")
 WORKER_ID: str = platform.node()
+# Identifies this process in Redis (processing list, heartbeat, lock owner).
+# The hostname alone is shared by host-network containers and by several
+# workers on one machine, so each start gets its own suffix
+INSTANCE_ID: str = f"{WORKER_ID}-{uuid.uuid4().hex[:8]}"
 HEALTH_PORT: int = int(os.getenv("HEALTH_PORT", "8080"))
+# Probed once; models are preloaded and every batch runs here
+DEVICE: torch.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 IDLE_TIMEOUT_S: int = int(os.getenv("IDLE_TIMEOUT_S", "900"))  # 15 min default
+# Tasks drained from the queue per batch, and how long to wait for them
+BATCH_MAX: int = int(os.getenv("BATCH_MAX", "8"))
+BATCH_WAIT_MS: int = int(os.getenv("BATCH_WAIT_MS", "50"))
+# Share of VRAM this process may use, and the reserved-memory level (MB,
+# 0 = never) above which the allocator cache is released after a batch
+GPU_MEM_FRACTION: float = float(os.getenv("GPU_MEM_FRACTION", "0.9"))
+CUDA_CACHE_TRIM_MB: int = int(os.getenv("CUDA_CACHE_TRIM_MB", "0"))
+# cuDNN autotuning runs once per input shape; uploads come in many sizes,
+# so it only pays off when most images share a resolution
+CUDNN_BENCHMARK: bool = os.getenv("CUDNN_BENCHMARK", "0") == "1"
+# Mist pads its input up to a multiple of this (>= 8, a multiple of 8).
+# 64 or 128 collapses nearby resolutions into one shape, which shares Mist
+# batches and makes CUDNN_BENCHMARK worthwhile; 8 adds no extra padding.
+MIST_BUCKET: int = int(os.getenv("MIST_BUCKET", "8"))
+# Threads for R2 download / C2PA signing / R2 upload within a batch
+IO_WORKERS: int = int(os.getenv("IO_WORKERS", "4"))
+# zlib level for the protected PNG; Mist noise leaves little for higher
+# levels to win, so the fastest level costs ~10% in size
+PNG_COMPRESS_LEVEL: int = int(os.getenv("PNG_COMPRESS_LEVEL", "1"))
+
+# tasks.error_log is capped at this many characters; tracebacks keep
+# only their innermost frames so the string is bounded before slicing
+ERROR_LOG_MAX: int = 4000
+TRACEBACK_FRAMES: int = 20
 
 # Must match apps/api/services/queue.py QUEUE_KEY
 QUEUE_KEY: str = "lore_anchor_tasks"
 DEAD_LETTER_KEY: str = "lore_anchor_dead_letters"
+# Per-image lock (SET NX) held while a delivery is in flight, so duplicates
+# that arrive together are skipped without a DB round trip.  It is released
+# once the outcome is recorded; the TTL only matters if a worker dies.
+# images.status, checked by start_image_task, stays the source of truth.
+LOCK_KEY_PREFIX: str = "lore_anchor_lock:"
+LOCK_TTL_S: int = int(os.getenv("LOCK_TTL_S", "3600"))
+# Payloads this worker has taken but not finished; they are only removed
+# once their outcome is recorded, so a crash leaves them here to re-queue
+PROCESSING_KEY_PREFIX: str = "lore_anchor_processing:"
+PROCESSING_KEY: str = f"{PROCESSING_KEY_PREFIX}{INSTANCE_ID}"
+# Liveness key refreshed while the worker runs; a processing list whose
+# owner's heartbeat has expired is re-queued by a live worker, at start and
+# then once per TTL
+HEARTBEAT_KEY_PREFIX: str = "lore_anchor_worker:"
+HEARTBEAT_TTL_S: int = int(os.getenv("HEARTBEAT_TTL_S", "60"))
 
 _shutdown_requested: bool = False
 _processing: bool = False
@@ -70,6 +150,9 @@ _images_processed: int = 0
 _images_failed: int = 0
 _last_task_time: float = time.monotonic()
 _worker_start_time: float = time.monotonic()
+# Outcomes are recorded from the I/O pool's threads
+_stats_lock = threading.Lock()
+_copy_stream: torch.cuda.Stream | None = None
 
 # ---------------------------------------------------------------------------
 # Required environment variables
@@ -153,7 +236,26 @@ def _init_supabase() -> Client:
     key: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
     if not url or not key:
         logger.warning("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not set — DB updates disabled")
-    return create_client(url, key)
+    # One HTTP/2 session for every PostgREST call.  httpx closes idle
+    # connections after 5 s by default, which is shorter than the gap between
+    # most tasks, so each write would pay a fresh TCP + TLS handshake.
+    http = httpx.Client(
+        timeout=httpx.Timeout(10.0),
+        follow_redirects=True,
+        transport=httpx.HTTPTransport(
+            http2=True,
+            retries=1,  # connection failures only, so it is safe for writes
+            limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300),
+        ),
+    )
+    try:
+        options = ClientOptions(httpx_client=http)
+    except TypeError:
+        # supabase-py releases without the httpx_client option
+        logger.warning("supabase-py has no httpx_client option; using its default HTTP client")
+        http.close()
+        return create_client(url, key)
+    return create_client(url, key, options=options)
 
 
 # ---------------------------------------------------------------------------
@@ -167,89 +269,125 @@ _db_retry = retry(
 
 
 @_db_retry
-def _get_image_status(sb: Client, image_id: str) -> str | None:
-    """Fetch the current status of an image from Supabase."""
+def _get_image_statuses(sb: Client, image_ids: list[str]) -> dict[str, str]:
+    """Fetch the status of several images in one query; missing rows are left out."""
     try:
-        result = sb.table("images").select("status").eq("id", image_id).execute()
-        if result.data:
-            return result.data[0]["status"]
-        return None
+        result = sb.table("images").select("id, status").in_("id", image_ids).execute()
+        return {row["id"]: row["status"] for row in result.data}
     except Exception:
-        logger.exception("Failed to fetch image status for image_id=%s", image_id)
+        logger.exception("Failed to fetch image statuses for %d image(s)", len(image_ids))
         raise
 
 
 @_db_retry
-def _update_image_status(
-    sb: Client,
-    image_id: str,
-    status: str,
-    *,
-    protected_url: str | None = None,
-    watermark_id: str | None = None,
-    c2pa_manifest: dict[str, Any] | None = None,
-) -> None:
-    """Update the ``images`` row for *image_id* in Supabase."""
-    data: dict[str, Any] = {"status": status}
-    if protected_url is not None:
-        data["protected_url"] = protected_url
-    if watermark_id is not None:
-        data["watermark_id"] = watermark_id
-    if c2pa_manifest is not None:
-        data["c2pa_manifest"] = c2pa_manifest
+def _reset_stranded_image(sb: Client, image_id: str) -> None:
+    """Move *image_id* from ``processing`` back to ``pending`` after its worker died."""
     try:
-        sb.table("images").update(data).eq("id", image_id).execute()
-        logger.info("images.status -> '%s' for image_id=%s", status, image_id)
+        (
+            sb.table("images")
+            .update({"status": "pending"})
+            .eq("id", image_id)
+            .eq("status", "processing")
+            .execute()
+        )
+        logger.debug("images.status -> 'pending' for stranded image_id=%s", image_id)
     except Exception:
-        logger.exception("Failed to update images status for image_id=%s", image_id)
+        logger.exception("Failed to reset stranded image_id=%s", image_id)
         raise
 
 
+# Each state change is one RPC (supabase/migrations/*_add_worker_task_rpcs.sql)
+# that updates ``images`` and ``tasks`` together, so a task costs three
+# round trips instead of five.
 @_db_retry
-def _insert_task(sb: Client, image_id: str) -> str | None:
-    """Insert a new row into ``tasks`` and return its id."""
+def _start_image_task(sb: Client, image_id: str) -> str | None:
+    """Mark *image_id* as processing and insert its ``tasks`` row; return the task id.
+
+    Returns ``None`` without changing anything if the image is already
+    ``processing`` or ``completed``, or has no ``images`` row.
+    """
     try:
-        result = (
-            sb.table("tasks")
-            .insert({
-                "image_id": image_id,
-                "worker_id": WORKER_ID,
-                "started_at": datetime.now(timezone.utc).isoformat(),
-            })
-            .execute()
+        result = sb.rpc(
+            "start_image_task", {"p_image_id": image_id, "p_worker_id": WORKER_ID},
+        ).execute()
+        task_id = cast(str | None, result.data)
+        logger.debug(
+            "images.status -> 'processing', task_id=%s for image_id=%s", task_id, image_id,
         )
-        task_id: str = result.data[0]["id"]
-        logger.info("tasks row created: task_id=%s for image_id=%s", task_id, image_id)
         return task_id
     except Exception:
-        logger.exception("Failed to insert tasks row for image_id=%s", image_id)
+        logger.exception("Failed to start task for image_id=%s", image_id)
         raise
 
 
 @_db_retry
-def _complete_task(sb: Client, task_id: str) -> None:
-    """Mark a task as completed."""
+def _complete_image_task(
+    sb: Client,
+    image_id: str,
+    task_id: str | None,
+    *,
+    protected_url: str,
+    watermark_id: str,
+    c2pa_manifest: dict[str, Any] | None = None,
+) -> None:
+    """Mark *image_id* as completed and close its task."""
     try:
-        sb.table("tasks").update({
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", task_id).execute()
+        sb.rpc("complete_image_task", {
+            "p_image_id": image_id,
+            "p_task_id": task_id,
+            "p_protected_url": protected_url,
+            "p_watermark_id": watermark_id,
+            "p_c2pa_manifest": c2pa_manifest,
+        }).execute()
+        logger.debug("images.status -> 'completed' for image_id=%s", image_id)
     except Exception:
-        logger.exception("Failed to update task completed_at for task_id=%s", task_id)
+        logger.exception("Failed to record completion for image_id=%s", image_id)
         raise
 
 
 @_db_retry
-def _fail_task(sb: Client, task_id: str, error_msg: str) -> None:
-    """Record an error on the task."""
+def _fail_image_task(sb: Client, image_id: str, task_id: str | None, error_msg: str) -> None:
+    """Mark *image_id* as failed and record the error on its task."""
     try:
-        sb.table("tasks").update({
-            "error_log": error_msg[:4000],
-        }).eq("id", task_id).execute()
+        sb.rpc("fail_image_task", {
+            "p_image_id": image_id,
+            "p_task_id": task_id,
+            "p_error_log": error_msg[:ERROR_LOG_MAX],
+        }).execute()
+        logger.debug("images.status -> 'failed' for image_id=%s", image_id)
     except Exception:
-        logger.exception("Failed to update task error_log for task_id=%s", task_id)
+        logger.exception("Failed to record failure for image_id=%s", image_id)
         raise
 
 
+# ---------------------------------------------------------------------------
+# Background DB writer
+# ---------------------------------------------------------------------------
+# Completion / failure writes go through this queue so the GPU thread can
+# start on the next batch while Supabase responds.  A single thread keeps
+# the writes in order; ``None`` stops it once everything before it is done.
+_DbWrite = tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any], str]
+_db_queue: queue.Queue[_DbWrite | None] = queue.Queue()
+
+
+def _db_writer() -> None:
+    """Run queued DB writes until the ``None`` sentinel arrives."""
+    while True:
+        item = _db_queue.get()
+        if item is None:
+            return
+        fn, args, kwargs, failure_msg = item
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.exception(failure_msg)
+
+
+def _defer_db(fn: Callable[..., Any], *args: Any, failure_msg: str, **kwargs: Any) -> None:
+    """Queue ``fn(*args, **kwargs)`` for the DB writer; log *failure_msg* if it raises."""
+    _db_queue.put((fn, args, kwargs, failure_msg))
+
+
 # ---------------------------------------------------------------------------
 # Dead-letter queue helper
 # ---------------------------------------------------------------------------
@@ -291,11 +429,54 @@ def _log_gpu_info() -> None:
         logger.warning("No CUDA GPU detected — will use CPU (slow)")
 
 
+def _configure_cuda_memory() -> None:
+    """Cap this process at ``GPU_MEM_FRACTION`` of the current GPU's memory."""
+    if not torch.cuda.is_available():
+        return
+    torch.cuda.set_per_process_memory_fraction(GPU_MEM_FRACTION)
+    logger.info(
+        "CUDA memory: fraction=%.2f, alloc_conf=%s",
+        GPU_MEM_FRACTION,
+        os.environ["PYTORCH_CUDA_ALLOC_CONF"],
+    )
+
+
+def _configure_cuda_math() -> None:
+    """Allow TF32 for the fp32 matmuls and convolutions left outside autocast.
+
+    The VAE and NN PixelSeal passes already run under bf16/fp16 autocast;
+    this covers the rest (and everything on GPUs without bf16).  Pixel
+    values are quantised to uint8 in fp32 either way.
+    """
+    if not torch.cuda.is_available():
+        return
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.backends.cudnn.benchmark = CUDNN_BENCHMARK
+    logger.info("CUDA math: tf32=on, cudnn.benchmark=%s", CUDNN_BENCHMARK)
+
+
+def _trim_cuda_cache() -> None:
+    """Release cached CUDA blocks once reserved memory passes ``CUDA_CACHE_TRIM_MB``."""
+    if CUDA_CACHE_TRIM_MB <= 0 or DEVICE.type != "cuda":
+        return
+    reserved_mb = torch.cuda.memory_reserved(DEVICE) / (1024**2)
+    if reserved_mb > CUDA_CACHE_TRIM_MB:
+        torch.cuda.empty_cache()
+        logger.info("Released CUDA cache (%.0f MB reserved)", reserved_mb)
+
+
 # ---------------------------------------------------------------------------
 # VAE pre-download
 # ---------------------------------------------------------------------------
 def _preload_models(device: torch.device) -> None:
-    """Load VAE model from baked-in HuggingFace cache (no network required)."""
+    """Load VAE model from baked-in HuggingFace cache (no network required).
+
+    The PixelSeal tensor path is warmed up first.  On CUDA the VAE is then
+    warmed up too (and compiled first with ``MIST_COMPILE=1``) so the first
+    task runs at steady-state speed.
+    """
+    _warm_up_seal(device)
     hf_home = os.getenv("HF_HOME", "~/.cache/huggingface")
     logger.info("HF_HOME=%s", hf_home)
     try:
@@ -311,272 +492,901 @@ def _preload_models(device: torch.device) -> None:
             hf_home,
             exc_info=True,
         )
+        return
+    if device.type == "cuda":
+        _warm_up_vae(device)
+
+
+def _warm_up_seal(device: torch.device) -> None:
+    """Embed and extract a watermark on a 256x256 tensor on *device*.
+
+    Initialises the CUDA context and loads the kernels PixelSeal uses, so
+    the first task doesn't pay for them.
+    """
+    try:
+        t_start = time.monotonic()
+        x = torch.full((3, 256, 256), 128, dtype=torch.uint8, device=device)
+        extract_watermark_tensor(embed_watermark_tensor(x, "0" * 32))
+        logger.info("PixelSeal warmed up on %s in %.2fs", device, time.monotonic() - t_start)
+    except Exception:
+        logger.warning("PixelSeal warm-up failed", exc_info=True)
+
+
+def _warm_up_vae(device: torch.device) -> None:
+    """Run one small PGD job so first-use costs are paid before any task.
+
+    That covers CUDA context and cuDNN initialisation, allocator growth and,
+    with ``MIST_COMPILE=1``, compilation and CUDA-graph capture.  If the
+    compiled encoder fails here the eager one is restored, since Mist would
+    otherwise fall back to freq mode on every task.
+    """
+    from core.mist.mist_v2 import _compile_vae, _pgd_vae
+
+    vae = _compile_vae(device, MIST_COMPILE_MODE) if MIST_COMPILE else None
+    try:
+        logger.info("Warming up VAE (512x512 PGD)...")
+        t_start = time.monotonic()
+        _pgd_vae(
+            [Image.new("RGB", (512, 512), (128, 128, 128))],
+            epsilon=MIST_EPSILON,
+            steps=2,
+            device=device,
+        )
+        logger.info("VAE warmed up in %.1fs", time.monotonic() - t_start)
+    except Exception:
+        if vae is None:
+            logger.warning("VAE warm-up failed", exc_info=True)
+            return
+        logger.warning("torch.compile warm-up failed — using the eager VAE encoder", exc_info=True)
+        vae.encoder = vae.encoder._orig_mod
+        vae._lore_compiled = False
 
 
 # ---------------------------------------------------------------------------
 # Pipeline
 # ---------------------------------------------------------------------------
-def process_image(image_id: str, original_r2_key: str) -> dict[str, str | dict[str, Any] | None]:
-    """Execute the full defense pipeline for a single image.
+PipelineOutcome = dict[str, Any] | Exception
 
-    Each step is wrapped individually so that failures report the exact
-    step name.  On failure a ``PipelineStepError`` is raised.
 
-    Args:
-        image_id: UUID of the image record in Supabase.
-        original_r2_key: R2 object key for the original uploaded image.
+def _download_image(image_id: str, original_r2_key: str, pin: bool) -> torch.Tensor:
+    """Fetch and decode one original from R2 (runs on the I/O pool).
 
-    Returns:
-        dict with ``protected_r2_key``, ``watermark_id``, and ``c2pa_manifest``.
+    Decoding happens here too, so it overlaps the other downloads and the
+    compute thread's work instead of delaying PixelSeal.  Returns the
+    pixels as a uint8 ``[H, W, 3]`` host tensor, in pinned memory when
+    *pin* is set so the upload to the GPU is asynchronous.
+    """
+    try:
+        logger.debug("Step: download — fetching from R2: %s", original_r2_key)
+        data = download_from_r2_bytes(original_r2_key)
+        image = Image.open(io.BytesIO(data))
+        # convert() copies even when the mode already matches
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        pixels = np.asarray(image)
+        host = torch.empty(pixels.shape, dtype=torch.uint8, pin_memory=pin)
+        host.numpy()[...] = pixels
+        logger.debug("Step completed: download for image_id=%s", image_id)
+        return host
+    except Exception as exc:
+        raise PipelineStepError("download", exc) from exc
+
+
+def _upload_image(
+    host: torch.Tensor, device: torch.device, copy_stream: torch.cuda.Stream | None,
+) -> torch.Tensor:
+    """Copy a downloaded ``[H, W, 3]`` image to *device* as ``[3, H, W]``.
+
+    On CUDA the copy is issued on *copy_stream*, so it overlaps the kernels
+    the compute stream is still running for the previous image; the compute
+    stream then waits for this copy only.
     """
-    logger.info("Starting pipeline for image_id=%s", image_id)
+    if copy_stream is None:
+        return host.to(device).permute(2, 0, 1)
+    compute = torch.cuda.current_stream(device)
+    with torch.cuda.stream(copy_stream):
+        x = host.to(device, non_blocking=True)
+    compute.wait_stream(copy_stream)
+    # allocated on the copy stream but consumed on the compute stream
+    x.record_stream(compute)
+    return x.permute(2, 0, 1)
+
+
+def _seal_image(
+    image_id: str,
+    host: torch.Tensor,
+    device: torch.device,
+    copy_stream: torch.cuda.Stream | None = None,
+) -> tuple[str, torch.Tensor]:
+    """Upload and watermark one image.
+
+    Returns ``(watermark_id, watermarked)``, the latter a uint8
+    ``[3, H, W]`` tensor that stays on *device* for Mist.
+    """
+    watermark_id: str = uuid.uuid4().hex[:32]
+    try:
+        logger.debug("Step: pixelseal — embedding watermark (id=%s)", watermark_id)
+        x = _upload_image(host, device, copy_stream)
+        watermarked = embed_watermark_tensor(x, watermark_id)
+        logger.debug("Step completed: pixelseal for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("pixelseal", exc) from exc
+    return watermark_id, watermarked
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    logger.info("Using device: %s", device)
 
-    watermark_id: str = uuid.uuid4().hex[:32]
+def _verify_image(image_id: str, watermark_id: str, protected: torch.Tensor) -> None:
+    """Raise if the watermark did not survive Mist."""
+    try:
+        logger.debug("Step: verify_watermark — checking watermark integrity")
+        match, accuracy = verify_watermark(
+            None, watermark_id, extracted_id=extract_watermark_tensor(protected),
+        )
+        if not match:
+            raise RuntimeError(
+                f"Watermark destroyed by Mist (accuracy={accuracy:.1%}). "
+                "Image would be unprotected."
+            )
+        logger.info(
+            "Step completed: verify_watermark — accuracy=%.1f%% for image_id=%s",
+            accuracy * 100,
+            image_id,
+        )
+    except RuntimeError:
+        raise
+    except Exception as exc:
+        raise PipelineStepError("verify_watermark", exc) from exc
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp = Path(tmpdir)
-        original_path = tmp / "original.png"
-        watermarked_path = tmp / "watermarked.png"
-        protected_path = tmp / "protected.png"
-        signed_path = tmp / "signed.png"
 
-        # --- Step: download ---
-        try:
-            logger.info("Step: download — fetching from R2: %s", original_r2_key)
-            download_from_r2(original_r2_key, str(original_path))
-            image = Image.open(original_path).convert("RGB")
-            logger.info("Step completed: download for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("download", exc) from exc
+def _read_back(
+    x: torch.Tensor, copy_stream: torch.cuda.Stream | None,
+) -> tuple[torch.Tensor, torch.cuda.Event | None]:
+    """Start copying a ``[3, H, W]`` image back to the host as ``[H, W, 3]``.
 
-        # --- Step: pixelseal ---
-        try:
-            logger.info("Step: pixelseal — embedding watermark (id=%s)", watermark_id)
-            watermarked = embed_watermark(image, watermark_id, device=device)
-            watermarked.save(watermarked_path)
-            logger.info("Step completed: pixelseal for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("pixelseal", exc) from exc
+    On CUDA the copy goes into pinned memory on *copy_stream*, so neither
+    this thread nor the compute stream waits for it; the returned event
+    marks when the host tensor is ready to read.
+    """
+    hwc = x.permute(1, 2, 0).contiguous()
+    if copy_stream is None:
+        return hwc.cpu(), None
+    host = torch.empty(hwc.shape, dtype=torch.uint8, pin_memory=True)
+    copy_stream.wait_stream(torch.cuda.current_stream(hwc.device))
+    with torch.cuda.stream(copy_stream):
+        host.copy_(hwc, non_blocking=True)
+        ready = torch.cuda.Event()
+        ready.record()
+    # allocated on the compute stream but read on the copy stream
+    hwc.record_stream(copy_stream)
+    return host, ready
+
+
+def _publish_image(
+    image_id: str,
+    watermark_id: str,
+    pixels: torch.Tensor,
+    ready: torch.cuda.Event | None = None,
+) -> dict[str, Any]:
+    """Encode, sign and upload one verified image (runs on the I/O pool).
+
+    *pixels* is the protected image as a uint8 ``[H, W, 3]`` host tensor,
+    readable once *ready* (if given) has completed; it is encoded to PNG
+    once, and signed and uploaded from memory.
+    """
+    # --- Step: c2pa_sign ---
+    c2pa_manifest: dict[str, Any] | None = None
+    try:
+        logger.debug("Step: c2pa_sign — signing image")
+        if ready is not None:
+            ready.synchronize()
+        png = io.BytesIO()
+        Image.fromarray(pixels.numpy()).save(png, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+        signed, c2pa_manifest = sign_c2pa_bytes(png.getvalue())
+        logger.debug("Step completed: c2pa_sign for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("c2pa_sign", exc) from exc
+
+    # --- Step: upload ---
+    try:
+        protected_r2_key = f"protected/{image_id}.png"
+        logger.debug("Step: upload — uploading to R2: %s", protected_r2_key)
+        upload_to_r2_bytes(signed, protected_r2_key)
+        logger.debug("Step completed: upload for image_id=%s", image_id)
+    except Exception as exc:
+        raise PipelineStepError("upload", exc) from exc
+
+    return {
+        "protected_r2_key": protected_r2_key,
+        "watermark_id": watermark_id,
+        "c2pa_manifest": c2pa_manifest,
+    }
+
+
+def _mist_groups(sizes: dict[int, tuple[int, int]], bucket: int = 8) -> list[list[int]]:
+    """Group indices whose ``(h, w)`` sizes pad to the same *bucket*-aligned PGD input.
+
+    Images in one group stack into a single tensor without extra padding,
+    so with the default bucket batching them changes nothing about each
+    image's perturbation.
+    """
+    groups: dict[tuple[int, int], list[int]] = {}
+    for i, (h, w) in sizes.items():
+        groups.setdefault((-(-h // bucket) * bucket, -(-w // bucket) * bucket), []).append(i)
+    return list(groups.values())
+
+
+# Shared by every batch, so one batch's uploads can still be running while
+# the next one downloads
+_io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+# Each pending publish holds a pinned host copy of its image and competes
+# with the next batch's downloads for the pool, so at most IO_WORKERS are
+# in flight; the GPU stages wait for a slot before reading an image back
+_publish_slots = threading.BoundedSemaphore(IO_WORKERS)
+
+
+def _failed(exc: Exception) -> Future[dict[str, Any]]:
+    """A future that has already failed with *exc*."""
+    future: Future[dict[str, Any]] = Future()
+    future.set_exception(exc)
+    return future
 
-        # --- Step: mist_v2 ---
+
+def _outcome(future: Future[dict[str, Any]]) -> PipelineOutcome:
+    """Wait for *future* and return its result or the exception it raised."""
+    exc = future.exception()
+    return cast(Exception, exc) if exc is not None else future.result()
+
+
+def _start_downloads(jobs: list[tuple[str, str]]) -> list[Future[torch.Tensor]]:
+    """Submit the R2 download and decode of every ``(image_id, r2_key)`` job."""
+    pin = DEVICE.type == "cuda"
+    return [_io_pool.submit(_download_image, image_id, key, pin) for image_id, key in jobs]
+
+
+def _run_gpu_stages(
+    jobs: list[tuple[str, str]],
+    downloads: list[Future[torch.Tensor]],
+) -> list[Future[dict[str, Any]]]:
+    """PixelSeal, Mist v2 and verification for one batch of downloads.
+
+    Each verified image is handed to the I/O pool for signing and upload,
+    waiting while ``IO_WORKERS`` publishes are already in flight, and this
+    returns once the device work is done.  The result has one
+    future per job, resolving to that job's result dict or raising the
+    exception it failed with.
+    """
+    global _copy_stream
+
+    device = DEVICE
+    if device.type == "cuda" and _copy_stream is None:
+        _copy_stream = torch.cuda.Stream(device)
+
+    results: list[Future[dict[str, Any]] | None] = [None] * len(jobs)
+    prepared: dict[int, tuple[str, torch.Tensor]] = {}
+    # Only Mist's PGD needs autograd, and it sets up its own grad mode, so
+    # everything around it skips version counting and view tracking
+    with torch.inference_mode():
+        for i, download in enumerate(downloads):
+            try:
+                prepared[i] = _seal_image(jobs[i][0], download.result(), device, _copy_stream)
+            except Exception as exc:
+                results[i] = _failed(exc)
+
+    # --- Step: mist_v2 (batched per size group) ---
+    shapes = {i: tuple(x.shape[1:]) for i, (_, x) in prepared.items()}
+    for idx in _mist_groups(shapes, MIST_BUCKET):
         try:
-            logger.info(
-                "Step: mist_v2 — applying perturbation (epsilon=%d, steps=%d)",
+            logger.debug(
+                "Step: mist_v2 — applying perturbation to %d image(s) (epsilon=%d, steps=%d)",
+                len(idx),
                 MIST_EPSILON,
                 MIST_STEPS,
             )
-            protected = apply_mist_v2(
-                watermarked,
+            protected = apply_mist_v2_tensors(
+                [prepared[i][1] for i in idx],
                 epsilon=MIST_EPSILON,
                 steps=MIST_STEPS,
-                device=device,
+                bucket=MIST_BUCKET,
+                alpha_scale=MIST_ALPHA_SCALE,
             )
-            protected.save(protected_path)
-            logger.info("Step completed: mist_v2 for image_id=%s", image_id)
+            logger.debug("Step completed: mist_v2 for %d image(s)", len(idx))
         except Exception as exc:
-            raise PipelineStepError("mist_v2", exc) from exc
+            for i in idx:
+                results[i] = _failed(PipelineStepError("mist_v2", exc))
+            continue
 
-        # --- Step: verify_watermark (ensure watermark survived Mist) ---
-        try:
-            logger.info("Step: verify_watermark — checking watermark integrity")
-            match, accuracy = verify_watermark(protected, watermark_id, backend="dwt")
-            if not match:
-                raise RuntimeError(
-                    f"Watermark destroyed by Mist (accuracy={accuracy:.1%}). "
-                    "Image would be unprotected."
-                )
-            logger.info(
-                "Step completed: verify_watermark — accuracy=%.1f%% for image_id=%s",
-                accuracy * 100,
-                image_id,
-            )
-        except RuntimeError:
-            raise
-        except Exception as exc:
-            raise PipelineStepError("verify_watermark", exc) from exc
+        with torch.inference_mode():
+            for i, x in zip(idx, protected):
+                image_id, (watermark_id, _) = jobs[i][0], prepared[i]
+                try:
+                    _verify_image(image_id, watermark_id, x)
+                except Exception as exc:
+                    results[i] = _failed(exc)
+                    continue
+                # a failure here is this image's alone: earlier images of
+                # the batch are already publishing and must keep their outcome
+                _publish_slots.acquire()
+                try:
+                    pixels, ready = _read_back(x, _copy_stream)
+                    future = _io_pool.submit(_publish_image, image_id, watermark_id, pixels, ready)
+                except Exception as exc:
+                    _publish_slots.release()
+                    results[i] = _failed(PipelineStepError("c2pa_sign", exc))
+                    continue
+                future.add_done_callback(lambda _: _publish_slots.release())
+                results[i] = future
+
+    return cast(list[Future[dict[str, Any]]], results)
+
+
+def process_images(jobs: list[tuple[str, str]]) -> list[PipelineOutcome]:
+    """Execute the defense pipeline for several ``(image_id, r2_key)`` jobs.
+
+    R2 downloads, C2PA signing and uploads run on a pool of ``IO_WORKERS``
+    threads, so network I/O overlaps with compute: later images download
+    while earlier ones are sealed, and each Mist group uploads while the
+    next one runs.  Between download and upload each image stays a uint8
+    tensor on the device — PixelSeal, Mist v2 and verification all run on
+    it, and it is encoded to PNG once, for signing.  Mist v2 runs once per
+    group of same-sized images so the PGD forward/backward passes are
+    shared across the batch.
 
-        # --- Step: c2pa_sign ---
-        c2pa_manifest: dict[str, Any] | None = None
-        try:
-            logger.info("Step: c2pa_sign — signing image")
-            c2pa_manifest = sign_c2pa(str(protected_path), str(signed_path))
-            logger.info("Step completed: c2pa_sign for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("c2pa_sign", exc) from exc
+    Returns:
+        One entry per job, in order: the result dict (see
+        :func:`process_image`) or the exception that job failed with.  A
+        failing image does not affect the others.
+    """
+    logger.info("Starting pipeline for %d image(s) on %s", len(jobs), DEVICE)
+    return [_outcome(f) for f in _run_gpu_stages(jobs, _start_downloads(jobs))]
 
-        # --- Step: upload ---
-        try:
-            protected_r2_key = f"protected/{image_id}.png"
-            logger.info("Step: upload — uploading to R2: %s", protected_r2_key)
-            upload_to_r2(str(signed_path), protected_r2_key)
-            logger.info("Step completed: upload for image_id=%s", image_id)
-        except Exception as exc:
-            raise PipelineStepError("upload", exc) from exc
 
-    return {
-        "protected_r2_key": protected_r2_key,
-        "watermark_id": watermark_id,
-        "c2pa_manifest": c2pa_manifest,
-    }
+def process_image(image_id: str, original_r2_key: str) -> dict[str, str | dict[str, Any] | None]:
+    """Execute the full defense pipeline for a single image.
+
+    Each step is wrapped individually so that failures report the exact
+    step name.  On failure a ``PipelineStepError`` is raised.
+
+    Args:
+        image_id: UUID of the image record in Supabase.
+        original_r2_key: R2 object key for the original uploaded image.
+
+    Returns:
+        dict with ``protected_r2_key``, ``watermark_id``, and ``c2pa_manifest``.
+    """
+    outcome = process_images([(image_id, original_r2_key)])[0]
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
 
 
 # ---------------------------------------------------------------------------
 # Redis BLPOP consumer loop
 # ---------------------------------------------------------------------------
-def _run_consumer() -> None:
-    """Block on Redis ``BLPOP`` and process tasks one at a time."""
-    global _processing, _images_processed, _images_failed, _last_task_time
+def _redis_client() -> redis.Redis:  # type: ignore[type-arg]
+    """Client on a pool whose connections survive idle periods behind NAT.
 
-    r = redis.from_url(REDIS_URL, decode_responses=True)
-    sb = _init_supabase()
-    logger.info("Worker started, listening on queue: %s", QUEUE_KEY)
-    if IDLE_TIMEOUT_S > 0:
-        logger.info("Idle timeout enabled: %d seconds", IDLE_TIMEOUT_S)
+    TCP keepalive probes after 60 s idle stop the connection from being
+    dropped silently between tasks, and a PING every 30 s catches one that
+    was dropped anyway before a command is sent on it.
+    """
+    keepalive = {
+        getattr(socket, name): value
+        for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+        if hasattr(socket, name)  # Linux names; not all platforms have them
+    }
+    pool = redis.ConnectionPool.from_url(
+        REDIS_URL,
+        decode_responses=True,
+        socket_keepalive=True,
+        socket_keepalive_options=keepalive,
+        health_check_interval=30,
+        retry_on_timeout=True,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+# Reconnect with backoff (~1 min in total) before giving up and crashing
+_redis_retry = retry(
+    retry=retry_if_exception_type((redis.ConnectionError, redis.TimeoutError)),
+    stop=stop_after_attempt(6),
+    wait=wait_exponential(multiplier=1, min=1, max=30),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
+
+_has_blmove: bool = True  # cleared on the first "unknown command" (Redis < 6.2)
+
+# Moves up to ARGV[1] payloads from the head of KEYS[1] to the tail of
+# KEYS[2] atomically and in one round trip; LPOP/RPUSH work on any version
+_MOVE_BATCH_LUA = """
+local moved = {}
+for _ = 1, tonumber(ARGV[1]) do
+    local raw = redis.call('LPOP', KEYS[1])
+    if not raw then break end
+    redis.call('RPUSH', KEYS[2], raw)
+    moved[#moved + 1] = raw
+end
+return moved
+"""
 
-    while not _shutdown_requested:
-        # BLPOP blocks for up to 5 seconds, then re-checks shutdown flag.
-        result: tuple[str, str] | None = r.blpop(QUEUE_KEY, timeout=5)  # type: ignore[assignment]
-        if result is None:
-            # Check idle timeout (scale-to-zero for SaladCloud GPU workers)
-            if IDLE_TIMEOUT_S > 0:
-                idle_s = time.monotonic() - _last_task_time
-                if idle_s >= IDLE_TIMEOUT_S:
-                    logger.info(
-                        "Idle timeout reached (%.0fs >= %ds). Shutting down for scale-to-zero.",
-                        idle_s, IDLE_TIMEOUT_S,
-                    )
-                    break
-            continue
 
-        _key, raw_payload = result
-        _last_task_time = time.monotonic()
-        logger.info("Received raw task payload: %s", raw_payload)
+def _pop_blocking(r: redis.Redis, timeout: float = 5) -> str | None:  # type: ignore[type-arg]
+    """Block up to *timeout* seconds for one payload and move it onto ``PROCESSING_KEY``.
 
+    Uses ``BLMOVE`` so the payload is never only in this process's memory;
+    on Redis < 6.2 it falls back to ``BLPOP`` followed by ``RPUSH``.
+    """
+    global _has_blmove
+
+    if _has_blmove:
         try:
-            payload: dict[str, Any] = json.loads(raw_payload)
-            image_id: str = payload["image_id"]
-            storage_key: str = payload["storage_key"]
-        except (json.JSONDecodeError, KeyError) as exc:
-            logger.error("Invalid task payload: %s — %s", raw_payload, exc)
-            _send_to_dlq(r, raw_payload, str(exc))
-            continue
+            return r.blmove(QUEUE_KEY, PROCESSING_KEY, timeout, "LEFT", "RIGHT")  # type: ignore[return-value]
+        except redis.ResponseError as exc:
+            if "unknown command" not in str(exc).lower():
+                raise
+            logger.info("Redis has no BLMOVE (needs 6.2), using BLPOP + RPUSH")
+            _has_blmove = False
+    result = r.blpop(QUEUE_KEY, timeout=timeout)
+    if result is None:
+        return None
+    # not atomic: a crash between the two commands loses this one payload
+    r.rpush(PROCESSING_KEY, result[1])  # type: ignore[index]
+    return result[1]  # type: ignore[index]
+
+
+@_redis_retry
+def _drain_batch(
+    r: redis.Redis,  # type: ignore[type-arg]
+    max_batch: int = BATCH_MAX,
+    max_wait_ms: int = BATCH_WAIT_MS,
+) -> list[str]:
+    """Block for the first payload, then top up to *max_batch* within *max_wait_ms*.
+
+    The top-up takes whatever is queued in one scripted round trip.  If the
+    batch is still short it blocks once more for the rest of the window and,
+    when something arrives, tops up one last time, so a batch costs at most
+    four round trips however the tasks trickle in.
+
+    Every payload returned has been moved onto ``PROCESSING_KEY`` and must
+    be acknowledged with :func:`_ack` once it is finished.  Returns an empty
+    list if nothing arrived within the blocking timeout (5 s), so the caller
+    can re-check the shutdown flag.
+    """
+    first = _pop_blocking(r)
+    if first is None:
+        return []
+    payloads = [first]
+    move_batch = r.register_script(_MOVE_BATCH_LUA)
+    deadline = time.monotonic() + max_wait_ms / 1000
+    waited = False
+    try:
+        while len(payloads) < max_batch:
+            more: list[str] = move_batch(
+                keys=[QUEUE_KEY, PROCESSING_KEY], args=[max_batch - len(payloads)],
+            )  # type: ignore[assignment]
+            payloads.extend(more)
+            remaining = deadline - time.monotonic()
+            # Redis reads a timeout under 1 ms as 0, which blocks forever
+            if len(payloads) >= max_batch or waited or remaining < 0.001:
+                break
+            waited = True
+            straggler = _pop_blocking(r, remaining)
+            if straggler is None:
+                break
+            payloads.append(straggler)
+    except (redis.ConnectionError, redis.TimeoutError):
+        # keep what was already moved rather than dropping it
+        logger.warning("Redis error while topping up the batch", exc_info=True)
+    return payloads
+
+
+def _ack(r: redis.Redis, raw_payload: str) -> None:  # type: ignore[type-arg]
+    """Remove a finished payload from ``PROCESSING_KEY``."""
+    try:
+        r.lrem(PROCESSING_KEY, 1, raw_payload)
+    except redis.RedisError:
+        logger.warning("Failed to acknowledge task payload: %s", raw_payload)
+
+
+# Moves ARGV[1] from KEYS[1] to the head of KEYS[2] only if it was still
+# there, so two workers reclaiming the same list can't both take it
+_REQUEUE_LUA = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call('LPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def _payload_image_id(raw_payload: str) -> str | None:
+    """The ``image_id`` of a raw payload, or ``None`` if it doesn't parse."""
+    try:
+        return str(json.loads(raw_payload)["image_id"])
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return None
 
-        logger.info("Received task: image_id=%s", image_id)
 
-        # --- Dedup check: skip if already processing or completed ---
+def _is_uuid(value: str) -> bool:
+    """Whether *value* parses as a UUID (``images.id`` rejects anything else)."""
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _requeue_stranded(r: redis.Redis, sb: Client) -> None:  # type: ignore[type-arg]
+    """Put payloads left behind by dead workers back at the head of the queue.
+
+    A processing list belongs to a dead worker when its owner's heartbeat
+    has expired; lists with a live heartbeat, this worker's own included,
+    are never touched.  Each payload is checked against ``images.status``
+    first:
+
+    - ``completed`` — finished but never acknowledged; dropped.
+    - locked by another live worker — a duplicate of a delivery in flight;
+      dropped.
+    - ``processing`` — the dead worker's claim; reset to ``pending`` so the
+      redelivery passes ``start_image_task``.
+
+    Everything else is re-queued with its lock released.  A payload is
+    moved onto this worker's own list before its image is reset, so of two
+    workers reclaiming the same list only one resets and re-queues it, and
+    a crash in between leaves it on a list that is reclaimed in turn.  If
+    the statuses can't be read, the list is left alone until the next pass.
+    """
+    move = r.register_script(_REQUEUE_LUA)
+    for key in r.scan_iter(match=f"{PROCESSING_KEY_PREFIX}*"):
+        owner = key[len(PROCESSING_KEY_PREFIX):]
+        if r.exists(f"{HEARTBEAT_KEY_PREFIX}{owner}"):
+            continue
+        raws: list[str] = r.lrange(key, 0, -1)  # type: ignore[assignment]
+        if not raws:
+            continue
+        image_ids = {raw: _payload_image_id(raw) for raw in raws}
         try:
-            current_status = _get_image_status(sb, image_id)
-        except Exception:
-            current_status = None
-        if current_status in ("processing", "completed"):
-            logger.warning(
-                "Skipping duplicate task: image_id=%s already has status='%s'",
-                image_id,
-                current_status,
+            statuses = _get_image_statuses(
+                sb, sorted({i for i in image_ids.values() if i and _is_uuid(i)}),
             )
+        except Exception:
+            logger.warning("Leaving %d stranded task(s) on %s until the next pass", len(raws), key)
             continue
-        if current_status is None:
+
+        requeued = dropped = 0
+        # re-queued onto the head one by one, so go from the tail to keep
+        # the payloads in their original order
+        for raw in reversed(raws):
+            image_id = image_ids[raw]
+            if image_id is not None:
+                holder = r.get(f"{LOCK_KEY_PREFIX}{image_id}")
+                in_flight = holder not in (None, owner) and bool(
+                    r.exists(f"{HEARTBEAT_KEY_PREFIX}{holder}")
+                )
+                if statuses.get(image_id) == "completed" or in_flight:
+                    dropped += r.lrem(key, 1, raw)  # type: ignore[operator]
+                    continue
+            if not move(keys=[key, PROCESSING_KEY], args=[raw]):
+                continue  # another worker reclaimed it first
+            if image_id is not None:
+                if statuses.get(image_id) == "processing":
+                    try:
+                        _reset_stranded_image(sb, image_id)
+                    except Exception:
+                        move(keys=[PROCESSING_KEY, key], args=[raw])  # try again next pass
+                        continue
+                _release_lock(r, image_id)
+            # invalid payloads are re-queued too and go to the DLQ when popped
+            requeued += move(keys=[PROCESSING_KEY, QUEUE_KEY], args=[raw])  # type: ignore[operator]
+        if requeued or dropped:
             logger.warning(
-                "Image row not found for image_id=%s, processing anyway",
-                image_id,
+                "Reclaimed %s: re-queued %d stranded task(s), dropped %d done or in flight",
+                key, requeued, dropped,
             )
 
-        # --- Mark as processing ---
-        _processing = True
-        t_start = time.monotonic()
-        try:
-            _update_image_status(sb, image_id, "processing")
-        except Exception:
-            logger.warning("Failed to set processing status, continuing anyway")
-        task_id = None
+
+def _heartbeat(r: redis.Redis, sb: Client) -> None:  # type: ignore[type-arg]
+    """Refresh this worker's heartbeat key until shutdown; it then expires.
+
+    Once per TTL it also reclaims the lists of workers that died since, so
+    their payloads don't wait for the next worker to start.
+    """
+    key = f"{HEARTBEAT_KEY_PREFIX}{INSTANCE_ID}"
+    beats = 0
+    while not _shutdown_requested:
         try:
-            task_id = _insert_task(sb, image_id)
-        except Exception:
-            logger.warning("Failed to insert task row, continuing anyway")
+            r.set(key, 1, ex=HEARTBEAT_TTL_S)
+        except redis.RedisError:
+            logger.warning("Failed to refresh worker heartbeat")
+        beats += 1
+        if beats % 4 == 0:
+            try:
+                _requeue_stranded(r, sb)
+            except redis.RedisError:
+                logger.warning("Failed to reclaim stranded tasks", exc_info=True)
+        time.sleep(HEARTBEAT_TTL_S / 4)
+
+
+def _admit_task(
+    r: redis.Redis,  # type: ignore[type-arg]
+    sb: Client,
+    raw_payload: str,
+) -> tuple[str, str, str | None, str] | None:
+    """Validate and dedup one payload, then mark it as processing.
+
+    Returns ``(image_id, storage_key, task_id, raw_payload)``, or ``None``
+    if the payload was invalid (sent to the DLQ), is a duplicate, or names
+    an image whose row is gone; those are acknowledged here.  A payload is
+    a duplicate if another delivery of the image holds the lock, or if the
+    image is already ``processing`` or ``completed``.
+    """
+    logger.debug("Received raw task payload: %s", raw_payload)
 
+    try:
+        payload: dict[str, Any] = json.loads(raw_payload)
+        image_id: str = payload["image_id"]
+        storage_key: str = payload["storage_key"]
+    except (json.JSONDecodeError, KeyError) as exc:
+        logger.error("Invalid task payload: %s — %s", raw_payload, exc)
+        _send_to_dlq(r, raw_payload, str(exc))
+        _ack(r, raw_payload)
+        return None
+
+    logger.info("Received task: image_id=%s", image_id)
+
+    # --- Dedup fast path: skip if another delivery is already in flight ---
+    locked = False
+    try:
+        locked = bool(r.set(f"{LOCK_KEY_PREFIX}{image_id}", INSTANCE_ID, nx=True, ex=LOCK_TTL_S))
+        if not locked:
+            logger.warning("Skipping duplicate task: image_id=%s is locked", image_id)
+            _ack(r, raw_payload)
+            return None
+    except redis.RedisError:
+        logger.warning("Failed to take dedup lock for image_id=%s, relying on status", image_id)
+
+    # --- Mark as processing; skipped if already processing or completed ---
+    try:
+        task_id = _start_image_task(sb, image_id)
+    except Exception:
+        logger.warning("Failed to set processing status, continuing anyway")
+        return image_id, storage_key, None, raw_payload
+    if task_id is None:
+        # one extra read, only on this rare path, to tell the two cases apart
         try:
-            result_data = process_image(image_id, storage_key)
-
-            # --- Build public URL for the protected image ---
-            protected_r2_key: str = result_data["protected_r2_key"]
-            protected_url: str = (
-                f"{R2_PUBLIC_DOMAIN}/{protected_r2_key}"
-                if R2_PUBLIC_DOMAIN
-                else protected_r2_key
+            missing = image_id not in _get_image_statuses(sb, [image_id])
+        except Exception:
+            missing = False
+        if missing:
+            logger.warning("Skipping task: image_id=%s has no images row (deleted?)", image_id)
+        else:
+            logger.warning(
+                "Skipping duplicate task: image_id=%s is already processing or completed",
+                image_id,
             )
+        if locked:
+            _release_lock(r, image_id)
+        _ack(r, raw_payload)
+        return None
+    return image_id, storage_key, task_id, raw_payload
 
-            # --- Mark success in Supabase ---
-            try:
-                _update_image_status(
-                    sb,
-                    image_id,
-                    "completed",
-                    protected_url=protected_url,
-                    watermark_id=result_data["watermark_id"],
-                    c2pa_manifest=cast(dict[str, Any] | None, result_data.get("c2pa_manifest")),
-                )
-            except Exception:
-                logger.error("Failed to mark image as completed after retries")
-            if task_id:
-                try:
-                    _complete_task(sb, task_id)
-                except Exception:
-                    logger.error("Failed to mark task as completed after retries")
 
-            elapsed = time.monotonic() - t_start
+def _release_lock(r: redis.Redis, image_id: str) -> None:  # type: ignore[type-arg]
+    """Drop the in-flight lock for *image_id* once its delivery is done."""
+    try:
+        r.delete(f"{LOCK_KEY_PREFIX}{image_id}")
+    except redis.RedisError:
+        logger.warning("Failed to release dedup lock for image_id=%s", image_id)
+
+
+def _record_outcome(
+    sb: Client,
+    image_id: str,
+    task_id: str | None,
+    outcome: PipelineOutcome,
+    elapsed: float,
+) -> None:
+    """Record the result of one pipeline run in the counters and (queued) Supabase."""
+    global _images_processed, _images_failed
+
+    if not isinstance(outcome, Exception):
+        # --- Build public URL for the protected image ---
+        protected_r2_key: str = outcome["protected_r2_key"]
+        protected_url: str = (
+            f"{R2_PUBLIC_DOMAIN}/{protected_r2_key}"
+            if R2_PUBLIC_DOMAIN
+            else protected_r2_key
+        )
+
+        # --- Mark success in Supabase (background) ---
+        _defer_db(
+            _complete_image_task,
+            sb,
+            image_id,
+            task_id,
+            protected_url=protected_url,
+            watermark_id=outcome["watermark_id"],
+            c2pa_manifest=cast(dict[str, Any] | None, outcome.get("c2pa_manifest")),
+            failure_msg="Failed to mark image as completed after retries",
+        )
+
+        with _stats_lock:
             _images_processed += 1
-            logger.info("Pipeline completed: image_id=%s in %.1fs", image_id, elapsed)
-
-        except PipelineStepError as exc:
-            elapsed = time.monotonic() - t_start
-            error_detail = f"Step: {exc.step} | Error: {exc.original}"
-            logger.error(
-                "Pipeline failed at step %s: image_id=%s | %s (%.1fs elapsed)",
-                exc.step,
-                image_id,
-                exc.original,
-                elapsed,
+        logger.info("Pipeline completed: image_id=%s in %.1fs", image_id, elapsed)
+        return
+
+    if isinstance(outcome, PipelineStepError):
+        error_detail = f"Step: {outcome.step} | Error: {outcome.original}"
+        logger.error(
+            "Pipeline failed at step %s: image_id=%s | %s (%.1fs elapsed)",
+            outcome.step,
+            image_id,
+            outcome.original,
+            elapsed,
+        )
+    else:
+        error_detail = "".join(
+            traceback.format_exception(
+                type(outcome), outcome, outcome.__traceback__, limit=-TRACEBACK_FRAMES,
             )
-            _images_failed += 1
+        )[-ERROR_LOG_MAX:]
+        logger.error(
+            "Pipeline failed (unexpected): image_id=%s (%.1fs elapsed)",
+            image_id,
+            elapsed,
+            exc_info=outcome,
+        )
+    with _stats_lock:
+        _images_failed += 1
 
-            # --- Mark failure in Supabase ---
-            try:
-                _update_image_status(sb, image_id, "failed")
-            except Exception:
-                logger.error("Failed to mark image as failed after retries")
-            if task_id:
-                try:
-                    _fail_task(sb, task_id, error_detail)
-                except Exception:
-                    logger.error("Failed to record task error after retries")
+    # --- Mark failure in Supabase (background) ---
+    _defer_db(
+        _fail_image_task,
+        sb,
+        image_id,
+        task_id,
+        error_detail,
+        failure_msg="Failed to mark image as failed after retries",
+    )
 
-        except Exception:
-            elapsed = time.monotonic() - t_start
-            error_detail = traceback.format_exc()
-            logger.exception(
-                "Pipeline failed (unexpected): image_id=%s (%.1fs elapsed)",
-                image_id,
-                elapsed,
-            )
-            _images_failed += 1
 
-            # --- Mark failure in Supabase ---
+# A batch admitted by the prefetch thread: ``(image_id, storage_key, task_id,
+# raw_payload)`` per job and the download of each, already under way
+_Batch = tuple[list[tuple[str, str, str | None, str]], list[Future[torch.Tensor]]]
+
+
+def _prefetch_batches(
+    r: redis.Redis,  # type: ignore[type-arg]
+    sb: Client,
+    batches: queue.Queue[_Batch | None],
+    errors: list[BaseException],
+) -> None:
+    """Drain and admit batches and start their downloads, until shutdown.
+
+    Runs on its own thread so the next batch is fetched from R2 while the
+    GPU works on the current one; *batches* holds at most one batch, which
+    bounds how far ahead this gets.  Always finishes with ``None``; an
+    exception (e.g. Redis unreachable) is passed back through *errors*.
+    """
+    global _last_task_time
+
+    try:
+        while not _shutdown_requested:
+            payloads = _drain_batch(r)
+            if not payloads:
+                # Check idle timeout (scale-to-zero for SaladCloud GPU workers)
+                if IDLE_TIMEOUT_S > 0 and batches.empty() and not _processing:
+                    idle_s = time.monotonic() - _last_task_time
+                    if idle_s >= IDLE_TIMEOUT_S:
+                        logger.info(
+                            "Idle timeout reached (%.0fs >= %ds). Shutting down for scale-to-zero.",
+                            idle_s, IDLE_TIMEOUT_S,
+                        )
+                        break
+                continue
+
+            _last_task_time = time.monotonic()
+            jobs = [
+                job for job in (_admit_task(r, sb, raw) for raw in payloads)
+                if job is not None
+            ]
+            if jobs:
+                downloads = _start_downloads([(image_id, key) for image_id, key, _, _ in jobs])
+                batches.put((jobs, downloads))
+    except BaseException as exc:
+        errors.append(exc)
+    finally:
+        batches.put(None)
+
+
+def _on_published(
+    r: redis.Redis,  # type: ignore[type-arg]
+    sb: Client,
+    image_id: str,
+    task_id: str | None,
+    raw_payload: str,
+    t_start: float,
+    result: Future[dict[str, Any]],
+) -> None:
+    """Record one image's outcome once its upload (or an earlier step) has finished.
+
+    Failures are recorded in Supabase too, so the payload is acknowledged
+    either way; only a crash leaves it on the processing list.  The lock is
+    released either way too: a later delivery is then decided by the
+    image's status, which stays ``processing`` until the queued completion
+    or failure write lands.
+    """
+    outcome = _outcome(result)
+    try:
+        _record_outcome(sb, image_id, task_id, outcome, time.monotonic() - t_start)
+    finally:
+        _release_lock(r, image_id)
+        _ack(r, raw_payload)
+
+
+def _run_consumer() -> None:
+    """Run prefetched batches through the GPU stages as they arrive.
+
+    Three stages overlap: the prefetch thread drains Redis and downloads
+    the next batch, this thread runs PixelSeal and Mist on the current one,
+    and the I/O pool signs and uploads the previous one, recording each
+    outcome as its upload finishes.
+    """
+    global _processing, _last_task_time
+
+    r = _redis_client()
+    sb = _init_supabase()
+    logger.info("Worker started, listening on queue: %s", QUEUE_KEY)
+    logger.info("Batching: up to %d tasks within %d ms", BATCH_MAX, BATCH_WAIT_MS)
+    if IDLE_TIMEOUT_S > 0:
+        logger.info("Idle timeout enabled: %d seconds", IDLE_TIMEOUT_S)
+    db_thread = threading.Thread(target=_db_writer, name="db-writer", daemon=True)
+    db_thread.start()
+    # heartbeat first, so a worker starting alongside doesn't take our list
+    threading.Thread(target=_heartbeat, args=(r, sb), name="heartbeat", daemon=True).start()
+    _requeue_stranded(r, sb)
+
+    batches: queue.Queue[_Batch | None] = queue.Queue(maxsize=1)
+    errors: list[BaseException] = []
+    prefetch_thread = threading.Thread(
+        target=_prefetch_batches, args=(r, sb, batches, errors), name="prefetch", daemon=True,
+    )
+    prefetch_thread.start()
+
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        jobs, downloads = batch
+
+        _processing = True
+        t_start = time.monotonic()
+        try:
+            logger.info("Starting pipeline for %d image(s) on %s", len(jobs), DEVICE)
             try:
-                _update_image_status(sb, image_id, "failed")
-            except Exception:
-                logger.error("Failed to mark image as failed after retries")
-            if task_id:
-                try:
-                    _fail_task(sb, task_id, error_detail)
-                except Exception:
-                    logger.error("Failed to record task error after retries")
+                results = _run_gpu_stages(
+                    [(image_id, key) for image_id, key, _, _ in jobs], downloads,
+                )
+            except Exception as exc:
+                results = [_failed(exc) for _ in jobs]
 
+            for (image_id, _key, task_id, raw), result in zip(jobs, results):
+                result.add_done_callback(
+                    functools.partial(_on_published, r, sb, image_id, task_id, raw, t_start)
+                )
+            _trim_cuda_cache()
         finally:
             _processing = False
-
+            _last_task_time = time.monotonic()
+
+    prefetch_thread.join()
+    # let the last uploads finish and record their outcomes
+    _io_pool.shutdown(wait=True)
+    if not _db_queue.empty():
+        logger.info("Flushing %d pending DB write(s)...", _db_queue.qsize())
+    _db_queue.put(None)
+    db_thread.join()
+    if errors:
+        raise errors[0]
     logger.info("Shutdown complete.")
 
 
@@ -593,18 +1403,24 @@ if __name__ == "__main__":
         logger.info("lore-anchor GPU Worker starting")
         logger.info("=" * 60)
         _log_gpu_info()
+        _configure_cuda_memory()
+        _configure_cuda_math()
         logger.info("Redis URL: %s", REDIS_URL.split("@")[-1])  # hide password
-        logger.info("Mist config: epsilon=%d, steps=%d", MIST_EPSILON, MIST_STEPS)
+        logger.info(
+            "Mist config: epsilon=%d, steps=%d, alpha_scale=%.2f, compile=%s (%s), bucket=%d",
+            MIST_EPSILON, MIST_STEPS, MIST_ALPHA_SCALE,
+            MIST_COMPILE, MIST_COMPILE_MODE, MIST_BUCKET,
+        )
         logger.info("Queue key: %s", QUEUE_KEY)
-        logger.info("Worker ID: %s", WORKER_ID)
+        logger.info("Worker ID: %s (instance %s)", WORKER_ID, INSTANCE_ID)
         logger.info("=" * 60)
 
         # --- Start health check server ---
         _start_health_server()
 
-        # --- Pre-load models ---
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        _preload_models(device)
+        # --- Pre-load and warm up models ---
+        logger.info("Using device: %s", DEVICE)
+        _preload_models(DEVICE)
 
         # --- Graceful shutdown on SIGTERM (SaladCloud sends this on stop) ---
         def _handle_sigterm(signum: int, frame: Any) -> None:
@@ -622,7 +1438,7 @@ if __name__ == "__main__":
         logger.info("Redis connection OK")
         del _test_r
 
-        # --- Start BLPOP consumer loop ---
+        # --- Start consumer loop ---
         logger.info("Worker ready, entering consumer loop on queue: %s", QUEUE_KEY)
         _run_consumer()
 
@@ -39,7 +39,7 @@ logger = logging.getLogger("test-local-pipeline")
 
 def _create_test_image(size: int = 512) -> Image.Image:
     """Generate a colourful synthetic image for testing."""
-    arr = np.random.randint(0, 255, (size, size, 3), dtype=np.uint8)
+    arr = np.random.default_rng().integers(0, 255, (size, size, 3), dtype=np.uint8)
     return Image.fromarray(arr, "RGB")
 
 
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Queue integration test — validates that the API's RPUSH and the
-Worker's BLPOP use the same Redis key and payload format.
+Worker's BLMOVE use the same Redis key and payload format.
 
 Requires a running Redis instance (set REDIS_URL env var).
 
@@ -11,12 +11,17 @@ Usage:
 
     # Terminal 2: Enqueue a test task
     python workers/gpu-worker/test_queue_integration.py
+
+    # Or enqueue many, pipelined, to load the worker
+    python workers/gpu-worker/test_queue_integration.py --n 1000
 """
 from __future__ import annotations
 
+import argparse
 import json
 import logging
 import os
+import time
 
 import redis
 from dotenv import load_dotenv
@@ -28,9 +33,15 @@ logger = logging.getLogger("test-queue")
 
 # Must match both apps/api/services/queue.py and workers/gpu-worker/main.py
 QUEUE_KEY: str = "lore_anchor_tasks"
+# RPUSHes sent per pipeline round trip
+PIPELINE_CHUNK: int = 10_000
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=1, help="number of tasks to enqueue")
+    args = parser.parse_args()
+
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     logger.info("Connecting to Redis: %s", redis_url.split("@")[-1])
 
@@ -38,18 +49,29 @@ def main() -> None:
     r.ping()
     logger.info("Redis connection OK")
 
-    # Enqueue a test task with the same format as apps/api/services/queue.py
-    payload: dict[str, str] = {
-        "image_id": "test-image-00000000",
-        "storage_key": "raw/test-user/test-image.jpg",
-    }
-    length: int = r.rpush(QUEUE_KEY, json.dumps(payload))
-    logger.info("Enqueued test task (queue length=%d): %s", length, payload)
+    # Enqueue test tasks with the same format as apps/api/services/queue.py,
+    # pipelined so N tasks cost N / PIPELINE_CHUNK round trips
+    t_start = time.monotonic()
+    length = 0
+    pipe = r.pipeline(transaction=False)
+    for i in range(args.n):
+        payload: dict[str, str] = {
+            "image_id": f"test-image-{i:08d}",
+            "storage_key": "raw/test-user/test-image.jpg",
+        }
+        pipe.rpush(QUEUE_KEY, json.dumps(payload))
+        if (i + 1) % PIPELINE_CHUNK == 0 or i + 1 == args.n:
+            length = pipe.execute()[-1]
+    elapsed = time.monotonic() - t_start
+    logger.info(
+        "Enqueued %d test task(s) in %.3fs (%.0f/s, queue length=%d)",
+        args.n, elapsed, args.n / elapsed if elapsed > 0 else 0.0, length,
+    )
     logger.info(
-        "If the worker is running, it should pick up this task within ~5 seconds."
+        "If the worker is running, it should pick up the first task within ~5 seconds."
     )
     logger.info(
-        "Check worker logs for: 'Starting pipeline for image_id=test-image-00000000'"
+        "Check worker logs for: 'Received task: image_id=test-image-00000000'"
     )
 
 
@@ -13,8 +13,11 @@ Usage:
 from __future__ import annotations
 
 import logging
+import subprocess
 import sys
+import unittest
 import uuid
+from pathlib import Path
 
 import numpy as np
 from PIL import Image
@@ -22,7 +25,13 @@ from PIL import Image
 # Adjust path so we can import core.* when running from workers/gpu-worker/
 sys.path.insert(0, ".")
 
-from core.seal.pixelseal import embed_watermark, verify_watermark
+from core.seal import pixelseal
+from core.seal.pixelseal import (
+    embed_watermark,
+    embed_watermark_tensor,
+    extract_watermark_tensor,
+    verify_watermark,
+)
 from core.mist.mist_v2 import apply_mist_v2
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
@@ -44,6 +53,12 @@ def _make_test_image(width: int = 256, height: int = 256) -> Image.Image:
     return Image.fromarray(arr)
 
 
+def _abs_diff(a: Image.Image, b: Image.Image) -> np.ndarray:
+    """Per-pixel |a - b| as uint8, without widening either image."""
+    x, y = np.asarray(a), np.asarray(b)
+    return np.maximum(x, y) - np.minimum(x, y)
+
+
 def test_pixelseal_dwt_roundtrip() -> None:
     """Embed then extract — IDs must match exactly on clean image."""
     logger.info("=== Test: PixelSeal DWT round-trip ===")
@@ -54,11 +69,9 @@ def test_pixelseal_dwt_roundtrip() -> None:
     assert watermarked.size == img.size, "Size changed after watermarking"
 
     # Pixel diff should be small (invisible)
-    diff = np.abs(
-        np.array(watermarked, dtype=np.float32) - np.array(img, dtype=np.float32)
-    )
-    max_diff = diff.max()
-    mean_diff = diff.mean()
+    diff = _abs_diff(watermarked, img)
+    max_diff = int(diff.max())
+    mean_diff = float(diff.mean())
     logger.info("  Pixel diff — max=%.1f  mean=%.2f", max_diff, mean_diff)
     assert max_diff < 30, f"Watermark too visible (max diff {max_diff})"
 
@@ -98,36 +111,180 @@ def test_mist_freq_output() -> None:
     protected = apply_mist_v2(img, epsilon=16, steps=1, mode="freq")
     assert protected.size == img.size
 
-    diff = np.abs(
-        np.array(protected, dtype=np.float32) - np.array(img, dtype=np.float32)
-    )
-    max_diff = diff.max()
-    mean_diff = diff.mean()
+    diff = _abs_diff(protected, img)
+    max_diff = int(diff.max())
+    mean_diff = float(diff.mean())
     logger.info("  Perturbation — max=%.1f  mean=%.2f", max_diff, mean_diff)
     assert max_diff > 0, "No perturbation applied"
     assert max_diff <= 16 + 1, f"Perturbation exceeds epsilon (max={max_diff})"
     logger.info("  PASSED")
 
 
+def test_dwt_path_is_torch_free() -> None:
+    """DWT watermarking and Mist freq mode must not import torch.
+
+    The CPU worker relies on this; runs in a fresh interpreter so imports
+    made by the other tests don't mask a regression.
+    """
+    logger.info("=== Test: DWT + freq path does not import torch ===")
+    code = (
+        "import sys; sys.path.insert(0, '.')\n"
+        "from PIL import Image\n"
+        "from core.seal.pixelseal import embed_watermark, verify_watermark\n"
+        "from core.mist.mist_v2 import apply_mist_v2\n"
+        "img = Image.new('RGB', (128, 128), (120, 130, 140))\n"
+        "wm = embed_watermark(img, '0' * 32, backend='dwt')\n"
+        "apply_mist_v2(wm, epsilon=8, steps=1, mode='freq')\n"
+        "verify_watermark(wm, '0' * 32, backend='dwt')\n"
+        "assert 'torch' not in sys.modules, 'torch was imported'\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    stderr = proc.stderr.strip().splitlines()
+    assert proc.returncode == 0, stderr[-1] if stderr else f"exit code {proc.returncode}"
+    logger.info("  PASSED")
+
+
+def test_pixelseal_dwt_levels_and_odd_size() -> None:
+    """Two-level embedding and odd sizes round-trip; trimmed borders are untouched."""
+    logger.info("=== Test: PixelSeal DWT at 2 levels on an odd-sized image ===")
+    width, height = 301, 257
+    img = _make_test_image(width, height)
+    wm_id = uuid.uuid4().hex
+    for levels in (1, 2):
+        watermarked = embed_watermark(img, wm_id, backend="dwt", dwt_levels=levels)
+        assert watermarked.size == img.size
+
+        match, accuracy = verify_watermark(watermarked, wm_id, backend="dwt", dwt_levels=levels)
+        logger.info("  levels=%d  bit accuracy: %.1f%%", levels, accuracy * 100)
+        assert accuracy >= 0.75, f"Accuracy too low at {levels} level(s): {accuracy:.1%}"
+
+        # rows/columns past the last multiple of 2**levels carry no chips
+        block = 1 << levels
+        eh, ew = height - height % block, width - width % block
+        before, after = np.asarray(img), np.asarray(watermarked)
+        assert np.array_equal(after[eh:], before[eh:]), "bottom border changed"
+        assert np.array_equal(after[:, ew:], before[:, ew:]), "right border changed"
+    logger.info("  PASSED")
+
+
+def test_batched_watermarks_match_single() -> None:
+    """embed_watermarks / extract_watermarks match per-image calls, in input order.
+
+    The NN backend runs on random weights here: no decoding is expected,
+    only that size-bucketed batches give each image its own result.
+    """
+    import torch
+
+    logger.info("=== Test: batched watermark API matches per-image calls ===")
+    sizes = [(256, 256), (301, 257), (128, 192), (256, 256), (301, 257)]
+    images = [_make_test_image(w, h) for w, h in sizes]
+    wm_ids = [uuid.uuid4().hex for _ in images]
+    assert pixelseal._size_buckets(images, batch_size=1 << 10) == [[0, 3], [1, 4], [2]]
+    assert pixelseal._size_buckets(images, batch_size=1) == [[0], [3], [1], [4], [2]]
+
+    batched = pixelseal.embed_watermarks(images, wm_ids, backend="dwt")
+    for image, wm_id, out in zip(images, wm_ids, batched):
+        single = embed_watermark(image, wm_id, backend="dwt")
+        assert np.array_equal(np.asarray(out), np.asarray(single)), "batched DWT embed differs"
+    assert pixelseal.extract_watermarks(batched, backend="dwt") == wm_ids
+
+    torch.manual_seed(0)
+    models = pixelseal._build_nn_models("cpu")
+    original = pixelseal._get_nn_models
+    pixelseal._get_nn_models = lambda device: models
+    try:
+        cpu = torch.device("cpu")
+        batched = pixelseal.embed_watermarks(images, wm_ids, backend="nn", device=cpu, batch_size=2)
+        singles = [embed_watermark(im, i, backend="nn", device=cpu) for im, i in zip(images, wm_ids)]
+        for out, single in zip(batched, singles):
+            assert out.size == single.size
+            assert int(_abs_diff(out, single).max()) <= 1, "batched NN embed differs"
+        ids = pixelseal.extract_watermarks(batched, backend="nn", device=cpu, batch_size=2)
+        assert ids == [pixelseal.extract_watermark(out, backend="nn", device=cpu) for out in batched]
+    finally:
+        pixelseal._get_nn_models = original
+    logger.info("  PASSED")
+
+
+def test_dwt_tensor_matches_numpy() -> None:
+    """The tensor DWT path used in production must match the NumPy backend.
+
+    Checked on an even and an odd size, where the trimmed border is passed
+    through; both the embedded pixels and the extracted soft bits agree.
+    """
+    import torch
+
+    logger.info("=== Test: tensor DWT matches NumPy DWT ===")
+    for width, height in ((256, 256), (301, 257)):
+        img = _make_test_image(width, height)
+        wm_id = uuid.uuid4().hex
+        expected = np.asarray(pixelseal._embed_dwt(img, wm_id))
+        x = torch.from_numpy(np.array(img)).permute(2, 0, 1).contiguous()
+        embedded = embed_watermark_tensor(x, wm_id).permute(1, 2, 0).numpy()
+        assert np.array_equal(embedded, expected), f"embed differs at {width}x{height}"
+
+        soft = pixelseal._extract_dwt(Image.fromarray(expected))
+        y = torch.from_numpy(expected.copy()).permute(2, 0, 1)
+        np.testing.assert_allclose(pixelseal._extract_dwt_torch(y.float()), soft, atol=1e-4)
+        assert extract_watermark_tensor(y) == pixelseal._bits_to_id(soft) == wm_id
+    logger.info("  PASSED")
+
+
+def test_decoder_graph_replay_matches_eager() -> None:
+    """A replayed decoder graph must match eager decoding in a later autocast block.
+
+    The graph is captured in one autocast entry and replayed in another, so
+    it fails if the capture recorded weight copies owned by the first block.
+    """
+    import torch
+
+    if not torch.cuda.is_available():
+        raise unittest.SkipTest("CUDA not available")
+    logger.info("=== Test: CUDA graph decoder replay matches eager ===")
+    _, decoder = pixelseal._build_nn_models("cuda")
+    x = torch.rand(1, 3, 256, 256, device="cuda")
+    with torch.inference_mode(), pixelseal._nn_autocast("cuda"):
+        pixelseal._decode(decoder, x)  # captures the graph
+    with torch.inference_mode(), pixelseal._nn_autocast("cuda"):
+        replayed = pixelseal._decode(decoder, x)
+        eager = decoder(x)
+    torch.testing.assert_close(replayed, eager)
+    logger.info("  PASSED")
+
+
 def main() -> None:
     logger.info("Starting smoke tests...\n")
     tests = [
         test_pixelseal_dwt_roundtrip,
         test_mist_freq_output,
         test_pixelseal_survives_mist,
+        test_dwt_path_is_torch_free,
+        test_pixelseal_dwt_levels_and_odd_size,
+        test_batched_watermarks_match_single,
+        test_dwt_tensor_matches_numpy,
+        test_decoder_graph_replay_matches_eager,
     ]
     passed = 0
     failed = 0
+    skipped = 0
     for test_fn in tests:
         try:
             test_fn()
             passed += 1
+        except unittest.SkipTest as e:
+            logger.info("  SKIPPED: %s", e)
+            skipped += 1
         except Exception as e:
             logger.error("  FAILED: %s", e)
             failed += 1
         logger.info("")
 
-    logger.info("Results: %d passed, %d failed", passed, failed)
+    logger.info("Results: %d passed, %d failed, %d skipped", passed, failed, skipped)
     sys.exit(1 if failed else 0)
 
 
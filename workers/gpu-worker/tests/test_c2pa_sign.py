@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for C2PA signer reuse.
+
+The per-thread cache is checked against a stand-in ``c2pa`` module; the
+real library is exercised too when it is installed and production
+credentials are set (the bundled dev certificate is only a placeholder).
+
+Usage:
+    cd workers/gpu-worker
+    python -m tests.test_c2pa_sign
+"""
+from __future__ import annotations
+
+import importlib.util
+import io
+import logging
+import os
+import sys
+import threading
+import types
+import unittest
+
+from PIL import Image
+
+# Adjust path so we can import core.* when running from workers/gpu-worker/
+sys.path.insert(0, ".")
+
+from core import c2pa_sign
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("test_c2pa_sign")
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), (120, 130, 140)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _fake_c2pa(created: list[object]) -> types.ModuleType:
+    """A ``c2pa`` stand-in whose signers record the thread that uses them."""
+    module = types.ModuleType("c2pa")
+
+    class Signer:
+        def __init__(self) -> None:
+            self.owner = threading.get_ident()
+            created.append(self)
+
+    class Builder:
+        def __init__(self, manifest_json: str) -> None:
+            self.manifest_json = manifest_json
+
+        def sign(self, signer: Signer, mime: str, source: io.BytesIO, dest: io.BytesIO) -> None:
+            assert signer.owner == threading.get_ident(), "signer shared across threads"
+            dest.write(source.read() + b"signed")
+
+    module.SigningAlg = types.SimpleNamespace(ES256="es256")  # type: ignore[attr-defined]
+    module.create_signer = lambda **kwargs: Signer()  # type: ignore[attr-defined]
+    module.Builder = Builder  # type: ignore[attr-defined]
+    return module
+
+
+def test_signer_cached_per_thread() -> None:
+    """Two signs on one thread share a signer; another thread builds its own."""
+    created: list[object] = []
+    data = _png()
+    saved = sys.modules.get("c2pa")
+    sys.modules["c2pa"] = _fake_c2pa(created)
+    c2pa_sign._signers = threading.local()
+    try:
+        for _ in range(2):
+            signed, manifest = c2pa_sign.sign_c2pa_bytes(data)
+            assert signed == data + b"signed" and manifest is not None
+        assert len(created) == 1
+
+        results: list[tuple[bytes, object]] = []
+        thread = threading.Thread(target=lambda: results.append(c2pa_sign.sign_c2pa_bytes(data)))
+        thread.start()
+        thread.join()
+        assert results[0][1] is not None
+        assert len(created) == 2
+    finally:
+        c2pa_sign._signers = threading.local()
+        if saved is None:
+            sys.modules.pop("c2pa", None)
+        else:
+            sys.modules["c2pa"] = saved
+
+
+def test_real_signer_signs_twice() -> None:
+    """The cached native signer can be used for a second image."""
+    if importlib.util.find_spec("c2pa") is None:
+        raise unittest.SkipTest("c2pa-python not installed")
+    if not (os.environ.get("C2PA_CERT_PEM") and os.environ.get("C2PA_KEY_PEM")):
+        raise unittest.SkipTest("C2PA_CERT_PEM / C2PA_KEY_PEM not set")
+    c2pa_sign._signers = threading.local()
+    data = _png()
+    first, first_manifest = c2pa_sign.sign_c2pa_bytes(data)
+    second, second_manifest = c2pa_sign.sign_c2pa_bytes(data)
+    assert first_manifest is not None and second_manifest is not None
+    assert first != data and second != data
+
+
+def main() -> None:
+    tests = [
+        test_signer_cached_per_thread,
+        test_real_signer_signs_twice,
+    ]
+    passed = 0
+    failed = 0
+    skipped = 0
+    for test_fn in tests:
+        try:
+            test_fn()
+            passed += 1
+        except unittest.SkipTest as e:
+            logger.info("SKIPPED %s: %s", test_fn.__name__, e)
+            skipped += 1
+        except Exception as e:
+            logger.error("FAILED %s: %r", test_fn.__name__, e)
+            failed += 1
+
+    logger.info("Results: %d passed, %d failed, %d skipped", passed, failed, skipped)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Unit tests for how Mist v2 work is batched.
+
+Covers the worker's size grouping and the one-image-at-a-time retry after
+a batched VAE run runs out of GPU memory.  The PGD itself is stubbed, so
+no VAE weights or GPU are needed.
+
+Usage:
+    cd workers/gpu-worker
+    python -m tests.test_mist_batching
+"""
+from __future__ import annotations
+
+import logging
+import sys
+
+import torch
+
+# Adjust path so we can import the worker when running from workers/gpu-worker/
+sys.path.insert(0, ".")
+
+import main as worker
+from core.mist import mist_v2
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("test_mist_batching")
+
+
+def test_mist_groups_by_padded_size() -> None:
+    """Sizes that pad to the same bucket-aligned shape share a group, in input order."""
+    sizes = {0: (256, 256), 1: (250, 249), 2: (256, 256), 3: (100, 60), 4: (264, 256)}
+    assert worker._mist_groups(sizes) == [[0, 1, 2], [3], [4]]
+    assert worker._mist_groups(sizes, bucket=64) == [[0, 1, 2], [3], [4]]
+    assert worker._mist_groups(sizes, bucket=512) == [[0, 1, 2, 3, 4]]
+    assert worker._mist_groups({}) == []
+
+
+def test_retry_split_only_on_batched_oom() -> None:
+    """Only an out-of-memory error on a batch of several images is split."""
+    oom = torch.cuda.OutOfMemoryError("CUDA out of memory")
+    assert mist_v2._retry_split(oom, 4)
+    assert not mist_v2._retry_split(oom, 1)
+    assert not mist_v2._retry_split(RuntimeError("boom"), 4)
+
+
+def test_oom_batch_retried_one_at_a_time() -> None:
+    """A batch that runs out of memory is redone per image, keeping the order."""
+    calls: list[int] = []
+
+    def pgd(images: list[torch.Tensor], **kwargs: object) -> list[torch.Tensor]:
+        calls.append(len(images))
+        if len(images) > 1:
+            raise torch.cuda.OutOfMemoryError("CUDA out of memory")
+        return [images[0] + 1]
+
+    images = [torch.full((3, 16, 16), n, dtype=torch.uint8) for n in range(3)]
+    original = mist_v2._pgd_vae_tensors
+    mist_v2._pgd_vae_tensors = pgd
+    try:
+        results = mist_v2.apply_mist_v2_tensors(images, epsilon=8, steps=1, mode="vae")
+    finally:
+        mist_v2._pgd_vae_tensors = original
+    assert calls == [3, 1, 1, 1]
+    assert [int(t[0, 0, 0]) for t in results] == [1, 2, 3]
+
+
+def main() -> None:
+    tests = [
+        test_mist_groups_by_padded_size,
+        test_retry_split_only_on_batched_oom,
+        test_oom_batch_retried_one_at_a_time,
+    ]
+    passed = 0
+    failed = 0
+    for test_fn in tests:
+        try:
+            test_fn()
+            passed += 1
+        except Exception as e:
+            logger.error("FAILED %s: %r", test_fn.__name__, e)
+            failed += 1
+
+    logger.info("Results: %d passed, %d failed", passed, failed)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
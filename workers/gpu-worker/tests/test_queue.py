@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the worker's Redis queue handling.
+
+Runs against an in-memory stand-in for the handful of Redis commands and
+the two Lua scripts the worker uses, so no Redis server is needed.
+
+Usage:
+    cd workers/gpu-worker
+    python -m tests.test_queue
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import types
+import uuid
+from typing import Any
+
+# Adjust path so we can import the worker when running from workers/gpu-worker/
+sys.path.insert(0, ".")
+
+import main as worker
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("test_queue")
+
+
+class FakeRedis:
+    """Lists and strings with just the commands ``main`` calls."""
+
+    def __init__(self, lists: dict[str, list[str]] | None = None, **strings: str) -> None:
+        self.lists = {k: list(v) for k, v in (lists or {}).items()}
+        self.strings = dict(strings)
+
+    def _list(self, key: str) -> list[str]:
+        return self.lists.setdefault(key, [])
+
+    def blmove(self, src: str, dst: str, timeout: float, wherefrom: str, whereto: str) -> str | None:
+        if not self._list(src):
+            return None
+        raw = self._list(src).pop(0)
+        self._list(dst).append(raw)
+        return raw
+
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        return list(self._list(key))
+
+    def lrem(self, key: str, count: int, value: str) -> int:
+        if value in self._list(key):
+            self._list(key).remove(value)
+            return 1
+        return 0
+
+    def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    def set(self, key: str, value: Any, nx: bool = False, ex: int | None = None) -> bool:
+        if nx and key in self.strings:
+            return False
+        self.strings[key] = value
+        return True
+
+    def exists(self, key: str) -> int:
+        return int(key in self.strings)
+
+    def delete(self, key: str) -> int:
+        return int(self.strings.pop(key, None) is not None)
+
+    def scan_iter(self, match: str) -> list[str]:
+        return [k for k in list(self.lists) if k.startswith(match.rstrip("*"))]
+
+    def register_script(self, script: str):  # type: ignore[no-untyped-def]
+        if script == worker._MOVE_BATCH_LUA:
+            def move_batch(keys: list[str], args: list[Any]) -> list[str]:
+                moved = self._list(keys[0])[:int(args[0])]
+                del self._list(keys[0])[:len(moved)]
+                self._list(keys[1]).extend(moved)
+                return moved
+            return move_batch
+        if script == worker._REQUEUE_LUA:
+            def requeue(keys: list[str], args: list[Any]) -> int:
+                if not self.lrem(keys[0], 1, args[0]):
+                    return 0
+                self._list(keys[1]).insert(0, args[0])
+                return 1
+            return requeue
+        raise AssertionError("unexpected script")
+
+
+class FakeSupabase:
+    """``images`` table reads and conditional status updates."""
+
+    def __init__(self, statuses: dict[str, str]) -> None:
+        self.statuses = statuses
+        self.resets: list[str] = []
+
+    def rpc(self, name: str, params: dict[str, str]) -> types.SimpleNamespace:
+        assert name == "start_image_task"
+        image_id = params["p_image_id"]
+        task_id = None
+        if self.statuses.get(image_id, "processing") not in ("processing", "completed"):
+            self.statuses[image_id] = "processing"
+            task_id = "task"
+        return types.SimpleNamespace(execute=lambda: types.SimpleNamespace(data=task_id))
+
+    def table(self, name: str) -> "FakeSupabase._Query":
+        assert name == "images"
+        return FakeSupabase._Query(self)
+
+    class _Query:
+        def __init__(self, sb: "FakeSupabase") -> None:
+            self.sb, self.filters, self.values, self.ids = sb, {}, None, []
+
+        def select(self, columns: str) -> "FakeSupabase._Query":
+            return self
+
+        def in_(self, column: str, ids: list[str]) -> "FakeSupabase._Query":
+            self.ids = ids
+            return self
+
+        def update(self, values: dict[str, str]) -> "FakeSupabase._Query":
+            self.values = values
+            return self
+
+        def eq(self, column: str, value: str) -> "FakeSupabase._Query":
+            self.filters[column] = value
+            return self
+
+        def execute(self) -> types.SimpleNamespace:
+            statuses = self.sb.statuses
+            if self.values is None:
+                rows = [{"id": i, "status": statuses[i]} for i in self.ids if i in statuses]
+                return types.SimpleNamespace(data=rows)
+            image_id = self.filters["id"]
+            if statuses.get(image_id) == self.filters["status"]:
+                statuses[image_id] = self.values["status"]
+                self.sb.resets.append(image_id)
+            return types.SimpleNamespace(data=[])
+
+
+def _payload(image_id: str) -> str:
+    return json.dumps({"image_id": image_id, "storage_key": f"raw/{image_id}.png"})
+
+
+def _heartbeat(owner: str) -> str:
+    return f"{worker.HEARTBEAT_KEY_PREFIX}{owner}"
+
+
+def _processing(owner: str) -> str:
+    return f"{worker.PROCESSING_KEY_PREFIX}{owner}"
+
+
+def _lock(image_id: str) -> str:
+    return f"{worker.LOCK_KEY_PREFIX}{image_id}"
+
+
+def test_drain_batch_tops_up_to_max() -> None:
+    """The first payload and the top-up all land on this worker's processing list."""
+    queued = [_payload(str(n)) for n in range(5)]
+    r = FakeRedis({worker.QUEUE_KEY: queued})
+    batch = worker._drain_batch(r, max_batch=3, max_wait_ms=0)
+    assert batch == queued[:3]
+    assert r.lists[worker.PROCESSING_KEY] == queued[:3]
+    assert r.lists[worker.QUEUE_KEY] == queued[3:]
+
+
+def test_drain_batch_empty_queue() -> None:
+    """Nothing queued within the blocking timeout gives an empty batch."""
+    r = FakeRedis()
+    assert worker._drain_batch(r, max_batch=3, max_wait_ms=0) == []
+    assert not r.lists.get(worker.PROCESSING_KEY)
+
+
+def test_drain_batch_blocks_once_for_stragglers() -> None:
+    """A short batch waits once for the rest of the window instead of polling."""
+    first, late = _payload("first"), _payload("late")
+    r = FakeRedis({worker.QUEUE_KEY: [first]})
+    calls: list[str] = []
+    blmove, register_script = r.blmove, r.register_script
+
+    def counted_blmove(src: str, dst: str, timeout: float, *where: str) -> str | None:
+        calls.append("blmove")
+        if len(calls) > 1:
+            assert 0 < timeout <= 0.05
+            r.lists[src].append(late)  # arrives during the wait
+        return blmove(src, dst, timeout, *where)
+
+    def counted_script(script: str):  # type: ignore[no-untyped-def]
+        run = register_script(script)
+        return lambda **kw: calls.append("script") or run(**kw)
+
+    r.blmove, r.register_script = counted_blmove, counted_script  # type: ignore[method-assign]
+    assert worker._drain_batch(r, max_batch=4, max_wait_ms=50) == [first, late]
+    assert calls == ["blmove", "script", "blmove", "script"]
+
+
+def test_ack_removes_one_payload() -> None:
+    """Acknowledging removes exactly one copy from the processing list."""
+    raw = _payload("a")
+    r = FakeRedis({worker.PROCESSING_KEY: [raw, raw]})
+    worker._ack(r, raw)
+    assert r.lists[worker.PROCESSING_KEY] == [raw]
+
+
+def test_admit_task_claims_pending_image() -> None:
+    """A pending image is claimed under this worker's lock and left on the list."""
+    image_id = str(uuid.uuid4())
+    raw = _payload(image_id)
+    r = FakeRedis({worker.PROCESSING_KEY: [raw]})
+    sb = FakeSupabase({image_id: "pending"})
+    assert worker._admit_task(r, sb, raw) == (image_id, f"raw/{image_id}.png", "task", raw)
+    assert r.get(_lock(image_id)) == worker.INSTANCE_ID
+    assert r.lists[worker.PROCESSING_KEY] == [raw]
+
+
+def test_admit_task_skips_missing_image() -> None:
+    """A payload whose images row is gone is acked and logged as such."""
+    image_id = str(uuid.uuid4())
+    raw = _payload(image_id)
+    r = FakeRedis({worker.PROCESSING_KEY: [raw]})
+    records: list[logging.LogRecord] = []
+    handler = logging.Handler()
+    handler.emit = records.append  # type: ignore[method-assign]
+    worker.logger.addHandler(handler)
+    try:
+        assert worker._admit_task(r, FakeSupabase({}), raw) is None
+    finally:
+        worker.logger.removeHandler(handler)
+    assert any("has no images row" in rec.getMessage() for rec in records)
+    assert r.lists[worker.PROCESSING_KEY] == []
+    assert r.get(_lock(image_id)) is None
+
+
+def test_requeue_stranded_branches() -> None:
+    """Completed and in-flight payloads are dropped, the rest re-queued in order."""
+    done, stuck, in_flight, pending = (str(uuid.uuid4()) for _ in range(4))
+    dead_list = [_payload(done), _payload(stuck), _payload(in_flight), _payload(pending), "garbage"]
+    r = FakeRedis(
+        {
+            worker.QUEUE_KEY: ["queued"],
+            _processing("deadbox"): dead_list,
+            _processing("live"): [_payload(in_flight)],
+        },
+        **{
+            _heartbeat("live"): "1",
+            _lock(in_flight): "live",
+            _lock(pending): "deadbox",
+        },
+    )
+    sb = FakeSupabase(
+        {done: "completed", stuck: "processing", in_flight: "processing", pending: "pending"},
+    )
+    worker._requeue_stranded(r, sb)
+
+    assert r.lists[worker.QUEUE_KEY] == [_payload(stuck), _payload(pending), "garbage", "queued"]
+    assert r.lists[_processing("deadbox")] == []
+    assert r.lists[_processing("live")] == [_payload(in_flight)]
+    assert not r.lists.get(worker.PROCESSING_KEY)
+    # only the dead worker's claim is reset; the live one keeps its lock
+    assert sb.resets == [stuck]
+    assert sb.statuses[in_flight] == "processing"
+    assert r.get(_lock(in_flight)) == "live"
+    assert r.get(_lock(pending)) is None
+
+
+def test_requeue_stranded_skips_live_lists() -> None:
+    """A list whose owner has a heartbeat is left alone, even if it shares our hostname."""
+    raw = _payload(str(uuid.uuid4()))
+    sibling = f"{worker.WORKER_ID}-0000"
+    r = FakeRedis({_processing(sibling): [raw]}, **{_heartbeat(sibling): "1"})
+    worker._requeue_stranded(r, FakeSupabase({}))
+    assert r.lists[_processing(sibling)] == [raw]
+    assert not r.lists.get(worker.QUEUE_KEY)
+
+
+def test_requeue_stranded_keeps_list_without_statuses() -> None:
+    """If the statuses can't be read, nothing is re-queued or dropped."""
+    raw = _payload(str(uuid.uuid4()))
+    r = FakeRedis({_processing("deadbox"): [raw]})
+    original = worker._get_image_statuses
+
+    def unavailable(sb: Any, image_ids: list[str]) -> dict[str, str]:
+        raise RuntimeError("supabase down")
+
+    worker._get_image_statuses = unavailable
+    try:
+        worker._requeue_stranded(r, FakeSupabase({}))
+    finally:
+        worker._get_image_statuses = original
+    assert r.lists[_processing("deadbox")] == [raw]
+    assert not r.lists.get(worker.QUEUE_KEY)
+
+
+def main() -> None:
+    tests = [
+        test_drain_batch_tops_up_to_max,
+        test_drain_batch_empty_queue,
+        test_drain_batch_blocks_once_for_stragglers,
+        test_ack_removes_one_payload,
+        test_admit_task_claims_pending_image,
+        test_admit_task_skips_missing_image,
+        test_requeue_stranded_branches,
+        test_requeue_stranded_skips_live_lists,
+        test_requeue_stranded_keeps_list_without_statuses,
+    ]
+    passed = 0
+    failed = 0
+    for test_fn in tests:
+        try:
+            test_fn()
+            passed += 1
+        except Exception as e:
+            logger.error("FAILED %s: %r", test_fn.__name__, e)
+            failed += 1
+
+    logger.info("Results: %d passed, %d failed", passed, failed)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()